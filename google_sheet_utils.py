@@ -1,28 +1,58 @@
+import asyncio
+import functools
 import gspread_asyncio
 from google.oauth2.service_account import Credentials
-import os
+import re
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+import threading
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import settings
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it leaderboards use the row-by-row engine
+    np = None
 
 
 SCOPE = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive.file']
 
 def get_creds():
     """Gets the Google credentials from the service account file."""
-    google_service_account_file = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE')
+    google_service_account_file = settings.get().google_service_account_file
     if not google_service_account_file:
         print("DEBUG_GSU_ERROR: GOOGLE_SERVICE_ACCOUNT_FILE not set in .env")
         return None
     
     return Credentials.from_service_account_file(google_service_account_file, scopes=SCOPE)
 
-async def get_sheet():
-    """Asynchronously authenticates with Google Sheets and returns the specific worksheet."""
+# One client manager for the whole process, so every team shares a single auth session and
+# gspread_asyncio's request throttle spaces out calls across all sheets together.
+_client_manager = None
+
+
+def get_client_manager():
+    """Returns the process-wide AsyncioGspreadClientManager, creating it on first use."""
+    global _client_manager
+    if _client_manager is None:
+        _client_manager = gspread_asyncio.AsyncioGspreadClientManager(get_creds)
+    return _client_manager
+
+
+async def get_sheet(source=None):
+    """
+    Asynchronously authenticates with Google Sheets and returns the specific worksheet.
+    'source' is a sales_sources.SalesSource; without one the first configured team's worksheet is used.
+    """
     try:
-        google_sheet_name = os.getenv('GOOGLE_SHEET_NAME')
-        google_sheet_id = os.getenv('GOOGLE_SPREADSHEET_ID')
-        google_sheet_worksheet_name = os.getenv('GOOGLE_SHEET_WORKSHEET_NAME')
+        if source is None:
+            source = settings.get().sales_sources[0]
+        google_sheet_name = source.spreadsheet_name
+        google_sheet_id = source.spreadsheet_id
+        google_sheet_worksheet_name = source.worksheet_name
 
         if not google_sheet_worksheet_name:
             print(f"DEBUG_GSU_ERROR: GOOGLE_SHEET_WORKSHEET_NAME ('{google_sheet_worksheet_name}') not set in .env or is invalid.")
@@ -31,8 +61,7 @@ async def get_sheet():
             print("DEBUG_GSU_ERROR: Neither GOOGLE_SPREADSHEET_ID nor GOOGLE_SHEET_NAME is set in .env")
             return None
 
-        agcm = gspread_asyncio.AsyncioGspreadClientManager(get_creds)
-        client = await agcm.authorize()
+        client = await get_client_manager().authorize()
 
         spreadsheet = None
         if google_sheet_id:
@@ -75,13 +104,93 @@ async def get_sheet():
             return None
 
     except FileNotFoundError:
-        print(f"DEBUG_GSU_ERROR: Service account JSON file not found at path: {os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE')}")
+        print(f"DEBUG_GSU_ERROR: Service account JSON file not found at path: {settings.get().google_service_account_file}")
         return None
     except Exception:
         print("DEBUG_GSU_ERROR: An unexpected error occurred in get_sheet:")
         traceback.print_exc()
         return None
 
+# Header row per worksheet URL, so column names are resolved to letters once rather than on every fetch.
+_header_cache = {}
+
+
+async def get_header_row(sheet, refresh=False):
+    """Returns the worksheet's header row, fetching it only the first time (or when refresh=True)."""
+    key = sheet.ws.url
+    if refresh or key not in _header_cache:
+        _header_cache[key] = await sheet.row_values(1)
+    return _header_cache[key]
+
+
+def _column_letter(col_number):
+    """1 -> 'A', 28 -> 'AB'."""
+    return gspread_asyncio.gspread.utils.rowcol_to_a1(1, col_number)[:-1]
+
+
+async def get_projected_columns(sheet, column_names, start_row=1):
+    """
+    Fetches only the named columns, from start_row to the end of the sheet, in a single batch_get.
+    Returns one list per column, padded to the same length, or None if a column can't be found.
+    The header cell of each column is checked in the same request, and the cached header row is
+    refreshed once if a column was moved or renamed.
+    """
+    column_names = list(column_names)
+    for attempt in range(2):
+        headers = await get_header_row(sheet, refresh=attempt > 0)
+        missing = [name for name in column_names if name not in headers]
+        if missing:
+            if attempt == 0:
+                continue
+            print(f"DEBUG_GSU_ERROR: Columns {missing} not found in the header row of '{sheet.title}'.")
+            return None
+
+        letters = [_column_letter(headers.index(name) + 1) for name in column_names]
+        ranges = [f"{letter}{start_row}:{letter}" for letter in letters]
+        if start_row > 1:
+            ranges += [f"{letter}1" for letter in letters]
+        value_ranges = await sheet.batch_get(ranges)
+
+        columns = [[cell[0] if cell else "" for cell in value_range] for value_range in value_ranges]
+        if start_row > 1:
+            header_cells = [column[0] if column else "" for column in columns[len(letters):]]
+            columns = columns[:len(letters)]
+        else:
+            header_cells = [column[0] if column else "" for column in columns]
+        if header_cells != column_names:
+            if attempt == 0:
+                print(f"DEBUG_GSU: Header row of '{sheet.title}' changed. Re-resolving columns.")
+                continue
+            print(f"DEBUG_GSU_ERROR: Header cells {header_cells} don't match requested columns {column_names}.")
+            return None
+
+        length = max((len(column) for column in columns), default=0)
+        return [column + [""] * (length - len(column)) for column in columns]
+    return None
+
+
+async def get_rows(sheet, row_numbers):
+    """
+    Fetches whole rows by 1-based row number with one batch_get, grouping consecutive rows into one range.
+    Returns {row_number: [values...]}.
+    """
+    groups = []
+    for row_number in sorted(set(row_numbers)):
+        if groups and row_number == groups[-1][1] + 1:
+            groups[-1][1] = row_number
+        else:
+            groups.append([row_number, row_number])
+    if not groups:
+        return {}
+
+    value_ranges = await sheet.batch_get([f"{first}:{last}" for first, last in groups])
+    rows = {}
+    for (first, last), value_range in zip(groups, value_ranges):
+        for offset in range(last - first + 1):
+            rows[first + offset] = list(value_range[offset]) if offset < len(value_range) else []
+    return rows
+
+
 async def get_all_sales_data(sheet):
     """Fetches all records from the sheet using get_all_records for dictionary format."""
     if not sheet:
@@ -99,31 +208,155 @@ async def get_all_sales_data(sheet):
         return []
 
 
-async def get_sales_leaderboard_data(sheet, timeframe='weekly'):
+SALE_TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M',
+    '%Y-%m-%d', '%m/%d/%Y'
+]
+
+# Below this many rows the per-row loop is already fast enough, so "auto" keeps it.
+VECTORIZED_MIN_ROWS = 5000
+
+# Windowed leaderboard reads: cells probed per search round (one batch_get each), rows read per probe
+# (so a blank cell doesn't waste the probe), the most rounds before giving up on narrowing further, and
+# how far out of date order rows may be before the sheet is treated as unordered.
+WINDOW_PROBES_PER_ROUND = 48
+WINDOW_PROBE_BLOCK = 3
+WINDOW_MAX_ROUNDS = 6
+WINDOW_MARGIN = timedelta(days=3)
+
+# Work on fewer rows than OFFLOAD_MIN_ROWS runs inline on the event loop; larger jobs go to a worker
+# thread. Setting PROCESS_POOL_MIN_ROWS sends jobs of at least that many rows to a worker process
+# instead, which frees the GIL but pays to pickle the columns, so it is off (0) by default.
+# Both are read from settings (defaults 2000 and 0).
+# Row loops check for cancellation this often.
+CANCEL_CHECK_INTERVAL = 4096
+
+_WALL_CLOCK_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+class AggregationCancelled(Exception):
+    """Raised inside an offloaded job when the coroutine waiting for it was cancelled."""
+
+
+def _raise_if_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise AggregationCancelled()
+
+
+def parse_sale_timestamp(value):
+    """Parses a sheet timestamp using the known formats. Returns a naive datetime or None."""
+    ts_to_parse = str(value).strip()
+    for fmt in SALE_TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(ts_to_parse, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_premium(premium_raw):
+    """Converts a premium cell like '$1,234.50' to a float. Raises ValueError if it isn't a number."""
+    premium_str = str(premium_raw).replace('$', '').replace(',', '')
+    return float(premium_str) if premium_str else 0.0
+
+
+class SalespersonTable:
     """
-    Fetches and processes sales data for the specified timeframe's leaderboard.
-    Timeframe can be 'weekly' or 'monthly'.
-    Fills remaining slots with salespeople who have had activity in the last two weeks.
+    Interned salesperson identities. Names from the sheet are normalized (case and extra whitespace
+    ignored) and mapped to small integer ids, so "John ", "john" and "John" are one person and rows
+    carry an int instead of their own copy of the name. SALESPERSON_ALIASES_FILE can point to a JSON
+    object mapping other spellings to a canonical name, e.g. {"Johnny": "John"}.
+    Ids are only meaningful inside one process; anything returned to callers uses display names.
     """
-    timestamp_column = os.getenv("TIMESTAMP_COLUMN")
-    first_name_column = os.getenv("FIRST_NAME_COLUMN")
-    premium_column = os.getenv("PREMIUM_COLUMN")
 
-    if not all([timestamp_column, first_name_column, premium_column]):
-        print("DEBUG_GSU_ERROR: One or more column names (TIMESTAMP_COLUMN, FIRST_NAME_COLUMN, PREMIUM_COLUMN) not set in .env")
-        return {}
-    
-    all_sales = await get_all_sales_data(sheet)
-    if not all_sales:
-        print("DEBUG_GSU: No sales data returned from get_all_sales_data for leaderboard.")
-        return {}
-    
-    leaderboard = {}
-    recently_active_names = set()
+    def __init__(self):
+        self._ids_by_raw = {}
+        self._ids_by_key = {}
+        self._names = []
+        self._aliases = None
+        self._lock = threading.Lock()
 
-    eastern_tz = ZoneInfo("America/New_York")
-    today = datetime.now(eastern_tz)
+    @staticmethod
+    def normalize(name):
+        return " ".join(str(name).split()).casefold()
+
+    def _load_aliases(self):
+        # Taken from settings on first use rather than at import, since .env is read after this module is imported.
+        # The file itself is read and checked by load_settings.
+        self._aliases = {}
+        aliases = settings.get().salesperson_aliases
+        for alias, canonical in aliases:
+            canonical = " ".join(canonical.split())
+            self._aliases[self.normalize(alias)] = canonical
+            self._aliases.setdefault(self.normalize(canonical), canonical)
+        if aliases:
+            print(f"DEBUG_GSU: Loaded {len(aliases)} salesperson aliases.")
+
+    def resolve(self, name):
+        """Returns the id for a sheet name, or None for a blank one."""
+        person_id = self._ids_by_raw.get(name)
+        if person_id is not None or not name:
+            return person_id
+        with self._lock:
+            if self._aliases is None:
+                self._load_aliases()
+            key = self.normalize(name)
+            if not key:
+                return None
+            display_name = self._aliases.get(key)
+            if display_name is not None:
+                key = self.normalize(display_name)
+            person_id = self._ids_by_key.get(key)
+            if person_id is None:
+                person_id = len(self._names)
+                self._ids_by_key[key] = person_id
+                self._names.append(display_name or " ".join(str(name).split()))
+            elif display_name is None and self._names[person_id].islower() and not str(name).islower():
+                # Prefer a capitalized spelling over an all-lowercase one seen first.
+                self._names[person_id] = " ".join(str(name).split())
+            self._ids_by_raw[name] = person_id
+            return person_id
+
+    def name(self, person_id):
+        """Display name for an id."""
+        return self._names[person_id]
+
+    def lookup(self, name):
+        """The id a name resolves to if that person is already in the table, else None. Never adds it."""
+        person_id = self._ids_by_raw.get(name)
+        if person_id is not None or not name:
+            return person_id
+        with self._lock:
+            if self._aliases is None:
+                self._load_aliases()
+            key = self.normalize(name)
+            display_name = self._aliases.get(key)
+            return self._ids_by_key.get(self.normalize(display_name) if display_name else key)
 
+    def canonical_name(self, name):
+        """The display name a sheet name resolves to, without adding it to the table. Blank names come back unchanged."""
+        person_id = self._ids_by_raw.get(name)
+        if person_id is None and name:
+            with self._lock:
+                if self._aliases is None:
+                    self._load_aliases()
+                key = self.normalize(name)
+                display_name = self._aliases.get(key)
+                person_id = self._ids_by_key.get(self.normalize(display_name) if display_name else key)
+                if person_id is None:
+                    return display_name or " ".join(str(name).split())
+        return name if person_id is None else self._names[person_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+salespeople = SalespersonTable()
+
+
+def get_leaderboard_period(timeframe, today):
+    """Returns (start_of_period, end_of_period, title_period) for 'weekly' or 'monthly'."""
     if timeframe == 'monthly':
         start_of_period = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         end_of_period = today.replace(hour=23, minute=59, second=59, microsecond=999999)
@@ -133,81 +366,682 @@ async def get_sales_leaderboard_data(sheet, timeframe='weekly'):
         start_of_period = start_of_period.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_period = start_of_period + timedelta(days=6, hours=23, minutes=59, seconds=59)
         title_period = "Week"
+    return start_of_period, end_of_period, title_period
 
-    two_weeks_ago = today - timedelta(days=14)
 
-    print(f"DEBUG_GSU: Calculating leaderboard for {title_period}: {start_of_period.strftime('%Y-%m-%d')} to {end_of_period.strftime('%Y-%m-%d')}")
-    print(f"DEBUG_GSU: Checking for recent activity since: {two_weeks_ago.strftime('%Y-%m-%d')}")
+def _aggregate_sales_rows(timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago, eastern_tz, cancel_event=None):
+    """Row-by-row aggregation over column lists. Returns (leaderboard, recently_active_names)."""
+    leaderboard = {}
+    # dict rather than set so the filler order is deterministic and matches the vectorized engine
+    recently_active_ids = {}
 
-    for i, sale_record in enumerate(all_sales):
-        sale_date = None
+    for i, (timestamp_value, first_name, premium_raw) in enumerate(zip(timestamps, names, premiums)):
+        if i % CANCEL_CHECK_INTERVAL == 0:
+            _raise_if_cancelled(cancel_event)
         try:
-            timestamp_value = sale_record.get(timestamp_column)
-            first_name = sale_record.get(first_name_column)
-            premium_raw  = sale_record.get(premium_column, "0")
-
             if not timestamp_value or not first_name:
                 continue
 
-            ts_to_parse = str(timestamp_value).strip()
-            common_formats = [
-                '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %H:%M', 
-                '%Y-%m-%d', '%m/%d/%Y'
-            ]
-            for fmt in common_formats:
-                try:
-                    sale_date = datetime.strptime(ts_to_parse, fmt)
-                    break 
-                except ValueError:
-                    continue
-
+            sale_date = parse_sale_timestamp(timestamp_value)
             if sale_date is None:
-                print(f"DEBUG_GSU_WARNING: Row {i+1}: COULD NOT PARSE timestamp '{ts_to_parse}'. Skipping.")
+                print(f"DEBUG_GSU_WARNING: Row {i+1}: COULD NOT PARSE timestamp '{str(timestamp_value).strip()}'. Skipping.")
                 continue
 
             sale_date = sale_date.replace(tzinfo=eastern_tz)
 
-            salesperson_name = str(first_name)
+            person_id = salespeople.resolve(first_name)
+            if person_id is None:
+                continue
 
             if sale_date >= two_weeks_ago:
-                recently_active_names.add(salesperson_name)
+                recently_active_ids[person_id] = None
 
             if start_of_period <= sale_date <= end_of_period:
-                premium_str = str(premium_raw).replace('$', '').replace(',', '')
                 try:
-                    premium_value = float(premium_str) if premium_str else 0.0
+                    premium_value = parse_premium(premium_raw)
                 except ValueError:
-                    print(f"DEBUG_GSU_WARNING: Could not convert premium '{premium_str}' to float for {salesperson_name}. Using 0.0.")
+                    print(f"DEBUG_GSU_WARNING: Could not convert premium '{premium_raw}' to float for {salespeople.name(person_id)}. Using 0.0.")
                     premium_value = 0.0
-                
-                if salesperson_name not in leaderboard:
-                    leaderboard[salesperson_name] = {"premium": 0.0, "apps": 0}
-                
-                leaderboard[salesperson_name]["premium"] += premium_value
-                leaderboard[salesperson_name]["apps"] += 1
+
+                if person_id not in leaderboard:
+                    leaderboard[person_id] = {"premium": 0.0, "apps": 0}
+
+                leaderboard[person_id]["premium"] += premium_value
+                leaderboard[person_id]["apps"] += 1
 
         except Exception as ex:
             print(f"DEBUG_GSU_ERROR: Unexpected error processing sale record #{i+1}: {ex}")
             traceback.print_exc()
-    
-    print(f"DEBUG_GSU: Found {len(leaderboard)} people with sales this {title_period.lower()}.")
-    print(f"DEBUG_GSU: Found {len(recently_active_names)} people with sales in the last two weeks.")
 
-    leaderboard_names = set(leaderboard.keys())
-    filler_candidates = [name for name in recently_active_names if name not in leaderboard_names]
+    return _by_display_name(leaderboard, recently_active_ids)
+
+
+def _by_display_name(leaderboard, recently_active_ids):
+    """Turns id-keyed aggregates back into the name-keyed dicts the leaderboard renders."""
+    return (
+        {salespeople.name(person_id): totals for person_id, totals in leaderboard.items()},
+        {salespeople.name(person_id): None for person_id in recently_active_ids},
+    )
+
+
+def parse_sale_row(timestamp_value, first_name, premium_raw):
+    """
+    Parses one sale row the way the leaderboard reads it.
+    Returns (salesperson id, naive sale_date, premium), or None for rows the leaderboard skips.
+    """
+    if not timestamp_value or not first_name:
+        return None
+    person_id = salespeople.resolve(first_name)
+    if person_id is None:
+        return None
+
+    sale_date = parse_sale_timestamp(timestamp_value)
+    if sale_date is None:
+        print(f"DEBUG_GSU_WARNING: COULD NOT PARSE timestamp '{str(timestamp_value).strip()}'. Skipping.")
+        return None
+
+    try:
+        premium_value = parse_premium(premium_raw)
+    except ValueError:
+        print(f"DEBUG_GSU_WARNING: Could not convert premium '{premium_raw}' to float for {salespeople.name(person_id)}. Using 0.0.")
+        premium_value = 0.0
+    return person_id, sale_date, premium_value
+
+
+def aggregate_parsed_sales(parsed_rows, start_of_period, end_of_period, two_weeks_ago, cancel_event=None):
+    """Aggregates rows already run through parse_sale_row. Returns (leaderboard, recently_active_names)."""
+    # Parsed dates are naive Eastern wall-clock times, which is how same-zone aware datetimes compare too.
+    start_of_period = start_of_period.replace(tzinfo=None)
+    end_of_period = end_of_period.replace(tzinfo=None)
+    two_weeks_ago = two_weeks_ago.replace(tzinfo=None)
+
+    leaderboard = {}
+    recently_active_ids = {}
+    for i, parsed in enumerate(parsed_rows):
+        if i % CANCEL_CHECK_INTERVAL == 0:
+            _raise_if_cancelled(cancel_event)
+        if parsed is None:
+            continue
+        person_id, sale_date, premium_value = parsed
+
+        if sale_date >= two_weeks_ago:
+            recently_active_ids[person_id] = None
+
+        if start_of_period <= sale_date <= end_of_period:
+            if person_id not in leaderboard:
+                leaderboard[person_id] = {"premium": 0.0, "apps": 0}
+            leaderboard[person_id]["premium"] += premium_value
+            leaderboard[person_id]["apps"] += 1
+
+    return _by_display_name(leaderboard, recently_active_ids)
+
+
+def _wall_clock_micros(value):
+    """Microseconds since 1970-01-01 on the naive wall clock (what same-zone datetime comparison uses)."""
+    return (value.replace(tzinfo=None) - _WALL_CLOCK_EPOCH) // _ONE_MICROSECOND
+
+
+class _TimestampParser:
+    """
+    Parses timestamp strings to wall-clock microseconds, caching the date and time halves separately.
+    Dates repeat constantly, so each distinct one goes through strptime once; times are matched
+    with precompiled patterns. Anything unusual falls back to parse_sale_timestamp, so the
+    accepted formats are exactly the same.
+    """
+    _DATE_FORMATS = (('iso', '%Y-%m-%d'), ('us', '%m/%d/%Y'))
+    # Same groups strptime builds for these directives, minus the leap seconds datetime rejects anyway.
+    # Times are often unique per row, so they are matched directly instead of going through strptime.
+    _TIME_PATTERNS = {
+        '%H:%M:%S': re.compile(r'(2[0-3]|[0-1]\d|\d):([0-5]\d|\d):([0-5]\d|\d)'),
+        '%I:%M:%S %p': re.compile(r'(1[0-2]|0[1-9]|[1-9]):([0-5]\d|\d):([0-5]\d|\d)\s+(am|pm)', re.IGNORECASE),
+        '%H:%M': re.compile(r'(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)'),
+    }
+    # (date family, time format) pairs in SALE_TIMESTAMP_FORMATS order; None means date only.
+    _COMBINATIONS = (('iso', '%H:%M:%S'), ('us', '%I:%M:%S %p'), ('us', '%H:%M'), ('iso', None), ('us', None))
+
+    def __init__(self):
+        self._dates = {}
+        self._times = {}
+        self._full = {}
+
+    def _date(self, text):
+        if text not in self._dates:
+            parsed = None
+            for family, fmt in self._DATE_FORMATS:
+                try:
+                    parsed = (family, _wall_clock_micros(datetime.strptime(text, fmt)))
+                    break
+                except ValueError:
+                    continue
+            self._dates[text] = parsed
+        return self._dates[text]
+
+    def _time(self, text):
+        if text not in self._times:
+            parsed = {}
+            for fmt, pattern in self._TIME_PATTERNS.items():
+                match = pattern.fullmatch(text)
+                if not match:
+                    continue
+                hour, minute = int(match.group(1)), int(match.group(2))
+                second = int(match.group(3)) if match.lastindex >= 3 else 0
+                if match.lastindex == 4:
+                    hour = hour % 12 + (12 if match.group(4).lower() == 'pm' else 0)
+                parsed[fmt] = hour * 3600 + minute * 60 + second
+            self._times[text] = parsed
+        return self._times[text]
+
+    def __call__(self, value):
+        """Returns wall-clock microseconds, or None if the value can't be parsed."""
+        text = str(value).strip()
+        parts = text.split(None, 1)
+        if parts:
+            date_part = self._date(parts[0])
+            time_part = self._time(parts[1].strip()) if len(parts) > 1 else None
+            if date_part is not None:
+                family, date_micros = date_part
+                for wanted_family, time_fmt in self._COMBINATIONS:
+                    if family != wanted_family:
+                        continue
+                    if time_fmt is None:
+                        if time_part is None:
+                            return date_micros
+                    elif time_part is not None and time_fmt in time_part:
+                        return date_micros + time_part[time_fmt] * 1_000_000
+                # A clean date with a time in the wrong style matches none of the formats either.
+                return None
+
+        if text not in self._full:
+            parsed = parse_sale_timestamp(text)
+            self._full[text] = None if parsed is None else _wall_clock_micros(parsed)
+        return self._full[text]
+
+
+# Cell shapes the vectorized engine parses straight from the character codes, one letter per position:
+# Y/m/d are date digits, H (24-hour) or I (12-hour) hour digits, M/S minute and second digits, and p/q the
+# two letters of AM/PM. Other characters must match exactly. The shapes can't overlap, and each is
+# one parse_sale_timestamp reads with the format of the same family, so any other cell can simply go
+# through _TimestampParser.
+def _column_timestamp_templates():
+    templates = ["YYYY-mm-dd HH:MM:SS", "YYYY-mm-dd"]
+    for month in ("mm", "m"):
+        for day in ("dd", "d"):
+            date = f"{month}/{day}/YYYY"
+            templates += [f"{date} II:MM:SS pq", f"{date} I:MM:SS pq", f"{date} HH:MM", f"{date} H:MM", date]
+    return tuple(templates)
+
+
+_COLUMN_TIMESTAMP_TEMPLATES = _column_timestamp_templates()
+# Allowed values per field; anything outside these is left to the fallback parser to reject.
+_COLUMN_FIELD_RANGES = {"m": (1, 12), "d": (1, 31), "H": (0, 23), "I": (1, 12), "M": (0, 59), "S": (0, 59)}
+# Columns are read as fixed-width strings this wide. A longer cell gets truncated to exactly this length,
+# which no template or fast premium has, so it is parsed from the original value instead.
+_COLUMN_WIDTH = 24
+# Premiums with more digits than this could lose precision as an int64 over a power of ten.
+_COLUMN_PREMIUM_DIGITS = 15
+
+
+def _column_codes(values, rows):
+    """
+    The chosen rows of a column as (character codes, lengths). Codes are a uint8 matrix; every
+    non-ASCII character becomes 255, which no template or premium character matches.
+    """
+    text = np.array(values, dtype=f"U{_COLUMN_WIDTH}")[rows]
+    codes = np.minimum(text.view(np.uint32).reshape(len(text), _COLUMN_WIDTH), 255).astype(np.uint8)
+    return codes, np.char.str_len(text)
+
+
+def _match_timestamp_template(codes, template):
+    """Checks rows of codes against one template. Returns (matched, fields) with one int array per field."""
+    matched = np.ones(len(codes), dtype=bool)
+    fields = {}
+    for position, char in enumerate(template):
+        column = codes[:, position]
+        if char in "YmdHIMS":
+            matched &= (column >= ord("0")) & (column <= ord("9"))
+            fields[char] = fields.get(char, 0) * 10 + (column.astype(np.int64) - ord("0"))
+        elif char == "p":
+            lowered = column | 32
+            matched &= (lowered == ord("a")) | (lowered == ord("p"))
+            fields["p"] = lowered == ord("p")
+        elif char == "q":
+            matched &= (column | 32) == ord("m")
+        else:
+            matched &= column == ord(char)
+    for field, (low, high) in _COLUMN_FIELD_RANGES.items():
+        if field in fields:
+            matched &= (fields[field] >= low) & (fields[field] <= high)
+    return matched, fields
+
+
+def _parse_timestamp_column(timestamps, rows):
+    """
+    Parses timestamps[rows] to wall-clock microseconds. Returns (parsed, micros) arrays over those rows.
+    Cells in one of the template shapes are parsed with integer arithmetic, each distinct date once;
+    the rest go through _TimestampParser, so the result is always what parse_sale_timestamp gives.
+    """
+    codes, lengths = _column_codes(timestamps, rows)
+    parsed = np.zeros(len(rows), dtype=bool)
+    micros = np.zeros(len(rows), dtype=np.int64)
+
+    for template in _COLUMN_TIMESTAMP_TEMPLATES:
+        candidates = np.flatnonzero((lengths == len(template)) & ~parsed)
+        if len(candidates) == 0:
+            continue
+        matched, fields = _match_timestamp_template(codes[candidates], template)
+        candidates = candidates[matched]
+        fields = {field: values[matched] for field, values in fields.items()}
+
+        day_keys, day_codes = np.unique(fields["Y"] * 10000 + fields["m"] * 100 + fields["d"], return_inverse=True)
+        day_micros = np.zeros(len(day_keys), dtype=np.int64)
+        day_ok = np.zeros(len(day_keys), dtype=bool)
+        for i, key in enumerate(day_keys.tolist()):
+            try:
+                day_micros[i] = _wall_clock_micros(datetime(key // 10000, key // 100 % 100, key % 100))
+                day_ok[i] = True
+            except ValueError:
+                continue
+
+        zeros = np.zeros(len(candidates), dtype=np.int64)
+        if "I" in fields:
+            hours = fields["I"] % 12 + np.where(fields["p"], 12, 0)
+        else:
+            hours = fields.get("H", zeros)
+        seconds = hours * 3600 + fields.get("M", zeros) * 60 + fields.get("S", zeros)
+        ok = day_ok[day_codes]
+        micros[candidates[ok]] = day_micros[day_codes[ok]] + seconds[ok] * 1_000_000
+        parsed[candidates[ok]] = True
+
+    parse_timestamp = _TimestampParser()
+    for i in np.flatnonzero(~parsed).tolist():
+        value = parse_timestamp(timestamps[int(rows[i])])
+        if value is not None:
+            micros[i] = value
+            parsed[i] = True
+    return parsed, micros
+
+
+def _parse_premium_column(premiums, rows):
+    """
+    parse_premium for premiums[rows], as a float array. Plain amounts ('$', ',' and at most one '.' around
+    the digits) are read from the character codes; a whole number over a power of ten rounds the
+    same way float() does. Anything else goes through parse_premium, once per distinct value.
+    """
+    codes, lengths = _column_codes(premiums, rows)
+    is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+    is_dot = codes == ord(".")
+    in_cell = np.arange(_COLUMN_WIDTH) < lengths[:, None]
+    allowed = is_digit | is_dot | (codes == ord("$")) | (codes == ord(","))
+    digit_count = is_digit.sum(axis=1)
+    plain = (allowed | ~in_cell).all(axis=1) & (is_dot.sum(axis=1) <= 1) & (digit_count <= _COLUMN_PREMIUM_DIGITS) & (lengths < _COLUMN_WIDTH)
+    # An empty cell is 0.0; one with separators but no digits isn't a number.
+    plain &= (digit_count > 0) | (lengths == 0)
+
+    whole = np.zeros(len(rows), dtype=np.int64)
+    for position in range(_COLUMN_WIDTH):
+        digit = is_digit[:, position]
+        whole = np.where(digit, whole * 10 + (codes[:, position].astype(np.int64) - ord("0")), whole)
+    decimals = (is_digit & (np.cumsum(is_dot, axis=1) > 0)).sum(axis=1)
+    values = np.where(plain, whole / np.power(10, decimals), 0.0)
+
+    fallback = {}
+    for i in np.flatnonzero(~plain).tolist():
+        premium_raw = str(premiums[int(rows[i])])
+        if premium_raw not in fallback:
+            try:
+                fallback[premium_raw] = parse_premium(premium_raw)
+            except ValueError:
+                print(f"DEBUG_GSU_WARNING: Could not convert premium '{premium_raw}' to float. Using 0.0.")
+                fallback[premium_raw] = 0.0
+        values[i] = fallback[premium_raw]
+    return values
+
+
+def aggregate_sales_columns_vectorized(timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago, cancel_event=None):
+    """
+    NumPy version of the row loop.
+    Names are mapped to their salesperson ids once per distinct name, timestamps and premiums are
+    parsed a column at a time, and per-person sums/counts come from bincounts.
+    Returns (leaderboard, recently_active_names) exactly like _aggregate_sales_rows.
+    """
+    row_count = len(timestamps)
+    if row_count == 0:
+        return {}, {}
+
+    # Names repeat constantly, so each distinct one is resolved once.
+    name_index = {name: code for code, name in enumerate(dict.fromkeys(names))}
+    name_codes = np.fromiter(map(name_index.__getitem__, names), dtype=np.int64, count=row_count)
+    person_ids = [salespeople.resolve(name) if name else None for name in name_index]
+    known = np.fromiter((person_id is not None for person_id in person_ids), dtype=bool, count=len(person_ids))
+    id_by_code = np.fromiter((person_id or 0 for person_id in person_ids), dtype=np.int64, count=len(person_ids))
+    name_ids = id_by_code[name_codes]
+    # Rows missing a timestamp or name are skipped, same as the row loop.
+    present = known[name_codes] & np.fromiter(map(bool, timestamps), dtype=bool, count=row_count)
+    person_count = max(len(salespeople), 1)
+    _raise_if_cancelled(cancel_event)
+
+    present_rows = np.flatnonzero(present)
+    ts_ok, ts_micros = _parse_timestamp_column(timestamps, present_rows)
+    _raise_if_cancelled(cancel_event)
+
+    if not ts_ok.all():
+        print(f"DEBUG_GSU_WARNING: {int((~ts_ok).sum())} rows have timestamps that COULD NOT BE PARSED. Skipping them.")
+    valid_rows = present_rows[ts_ok]
+    sale_micros = ts_micros[ts_ok]
+
+    in_period = (sale_micros >= _wall_clock_micros(start_of_period)) & (sale_micros <= _wall_clock_micros(end_of_period))
+    recent = sale_micros >= _wall_clock_micros(two_weeks_ago)
+    # Premiums only matter for rows in the period.
+    period_rows = valid_rows[in_period]
+    premium_values = _parse_premium_column(premiums, period_rows)
+    _raise_if_cancelled(cancel_event)
+
+    period_ids = name_ids[period_rows]
+    premium_totals = np.bincount(period_ids, weights=premium_values, minlength=person_count)
+    app_counts = np.bincount(period_ids, minlength=person_count)
+
+    # Keep the row loop's ordering: people appear in the order of their first sale in the period.
+    unique_ids, first_positions = np.unique(period_ids, return_index=True)
+    leaderboard = {}
+    for name_id in unique_ids[np.argsort(first_positions, kind='stable')]:
+        leaderboard[salespeople.name(name_id)] = {"premium": float(premium_totals[name_id]), "apps": int(app_counts[name_id])}
+
+    recent_ids, recent_positions = np.unique(name_ids[valid_rows[recent]], return_index=True)
+    recently_active_names = {salespeople.name(name_id): None for name_id in recent_ids[np.argsort(recent_positions, kind='stable')]}
+
+    return leaderboard, recently_active_names
+
+
+def _use_vectorized_engine(row_count):
+    """Picks the aggregation engine from LEADERBOARD_ENGINE ('auto', 'python' or 'numpy')."""
+    engine = settings.get().leaderboard_engine
+    if engine == "python":
+        return False
+    if np is None:
+        if engine == "numpy":
+            print("DEBUG_GSU_WARNING: LEADERBOARD_ENGINE=numpy but numpy is not installed. Using the Python engine.")
+        return False
+    return engine == "numpy" or row_count >= VECTORIZED_MIN_ROWS
+
+
+def aggregate_sales_columns(timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago, cancel_event=None):
+    """Aggregates column lists with whichever engine _use_vectorized_engine picks. Safe to run in a worker."""
+    if _use_vectorized_engine(len(timestamps)):
+        print(f"DEBUG_GSU: Using vectorized engine for {len(timestamps)} rows.")
+        return aggregate_sales_columns_vectorized(
+            timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago, cancel_event
+        )
+    return _aggregate_sales_rows(
+        timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago, start_of_period.tzinfo, cancel_event
+    )
+
+
+_thread_pool = None
+_process_pool = None
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="winbot-cpu")
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=1)
+    return _process_pool
+
+
+async def run_offloaded(func, *args, rows=0, use_process=False, cancellable=False):
+    """
+    Runs CPU-heavy func(*args) without blocking the event loop, so gateway heartbeats and
+    interaction acknowledgements keep flowing while a big sheet is parsed.
+    Jobs under OFFLOAD_MIN_ROWS rows run inline. Larger ones run in a worker thread, or in a worker
+    process when use_process is set and PROCESS_POOL_MIN_ROWS is reached (func and args must be picklable).
+    If the awaiting task is cancelled, a thread job with cancellable=True is told to stop at its next
+    checkpoint (func must accept cancel_event) and a process job that hasn't started yet is dropped.
+    """
+    if rows < settings.get().offload_min_rows:
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    process_min_rows = settings.get().process_pool_min_rows
+    if use_process and process_min_rows and rows >= process_min_rows:
+        try:
+            return await loop.run_in_executor(_get_process_pool(), functools.partial(func, *args))
+        except BrokenProcessPool:
+            global _process_pool
+            print("DEBUG_GSU_WARNING: Worker process pool broke. Recreating it and running this job in a thread.")
+            _process_pool = None
+
+    cancel_event = threading.Event() if cancellable else None
+    call = functools.partial(func, *args, cancel_event=cancel_event) if cancellable else functools.partial(func, *args)
+    try:
+        return await loop.run_in_executor(_get_thread_pool(), call)
+    except asyncio.CancelledError:
+        if cancel_event is not None:
+            cancel_event.set()
+        raise
+
+
+def finalize_leaderboard(leaderboard, recently_active_names, limit=20):
+    """Pads the board with recently active people at $0, sorts by premium and keeps the top `limit`."""
+    leaderboard = dict(leaderboard)
+    filler_candidates = [name for name in recently_active_names if name not in leaderboard]
 
     for name in filler_candidates:
-        if len(leaderboard) >= 20:
+        if len(leaderboard) >= limit:
             break
         leaderboard[name] = {"premium": 0.0, "apps": 0}
 
     sorted_leaderboard = dict(sorted(leaderboard.items(), key=lambda item: item[1]['premium'], reverse=True))
-    sorted_leaderboard = dict(list(sorted_leaderboard.items())[:20])
+    return dict(list(sorted_leaderboard.items())[:limit])
+
+
+# Start row of the last window found per worksheet, probed first on the next search.
+_window_start_hints = {}
+
+
+async def find_window_start_row(sheet, timestamp_column, cutoff):
+    """
+    Finds the first row whose timestamp might be on or after `cutoff` in a date-ordered sheet,
+    using rounds of evenly spaced single-column probe reads (a k-ary search).
+    Returns the row number, or None if the probes show the column isn't in date order.
+    The answer is conservative: rows before it are known to be earlier than the cutoff, provided
+    the sheet really is append-ordered. A single back-dated row hidden between probes can't be seen,
+    which is why callers widen the cutoff by WINDOW_MARGIN and LEADERBOARD_READ_MODE=full exists.
+    """
+    headers = await get_header_row(sheet)
+    if timestamp_column not in headers:
+        return None
+    letter = _column_letter(headers.index(timestamp_column) + 1)
+    cutoff_micros = _wall_clock_micros(cutoff)
+    margin_micros = WINDOW_MARGIN // _ONE_MICROSECOND
+    parse_timestamp = _TimestampParser()
+
+    lo, hi = 2, sheet.row_count + 1
+    observed = {}
+    hint = _window_start_hints.get(sheet.ws.url)
+    for round_number in range(WINDOW_MAX_ROUNDS):
+        if hi - lo <= WINDOW_PROBES_PER_ROUND * WINDOW_PROBE_BLOCK:
+            break
+        step = (hi - lo) / (WINDOW_PROBES_PER_ROUND + 1)
+        probe_rows = {lo + int(step * (k + 1)) for k in range(WINDOW_PROBES_PER_ROUND)}
+        if round_number == 0 and hint and lo < hint < hi:
+            probe_rows.update({hint - 1, hint})
+        probe_rows = sorted(probe_rows)
+        value_ranges = await sheet.batch_get([f"{letter}{row}:{letter}{row + WINDOW_PROBE_BLOCK - 1}" for row in probe_rows])
+
+        new_lo, new_hi = lo, hi
+        for row, value_range in zip(probe_rows, value_ranges):
+            # Use the first parseable cell of the block; blank or unreadable blocks tell us nothing.
+            for offset, cell in enumerate(value_range):
+                micros = parse_timestamp(cell[0]) if cell and cell[0] else None
+                if micros is None:
+                    continue
+                observed[row + offset] = micros
+                if micros < cutoff_micros:
+                    new_lo = max(new_lo, row + offset + 1)
+                else:
+                    new_hi = min(new_hi, row + offset)
+                break
+
+        if new_lo > new_hi:
+            print(f"DEBUG_GSU: Windowed read of '{sheet.title}': probes out of date order around rows {new_hi}-{new_lo}.")
+            return None
+        if (new_lo, new_hi) == (lo, hi):
+            break
+        lo, hi = new_lo, new_hi
+
+    # Every probed date must be in order (within the margin), or the search can't be trusted.
+    running_max = None
+    for row in sorted(observed):
+        if running_max is not None and observed[row] < running_max - margin_micros:
+            print(f"DEBUG_GSU: Windowed read of '{sheet.title}': row {row} is out of date order.")
+            return None
+        running_max = observed[row] if running_max is None else max(running_max, observed[row])
+
+    _window_start_hints[sheet.ws.url] = lo
+    return lo
+
+
+async def get_windowed_columns(sheet, column_names, timestamp_column, window_start):
+    """
+    Fetches the named columns for rows on or after window_start only, located by find_window_start_row.
+    Returns the columns (data rows only), or None if the sheet isn't date-ordered and needs a full read.
+    """
+    cutoff = window_start - WINDOW_MARGIN
+    start_row = await find_window_start_row(sheet, timestamp_column, cutoff)
+    if start_row is None:
+        return None
+    if start_row <= 2:
+        return await get_projected_columns(sheet, column_names, start_row=2)
+
+    columns = await get_projected_columns(sheet, column_names, start_row=start_row)
+    if columns is None:
+        return None
+
+    # Check the tail we actually read is in order too; one stray early date means rows may be missing.
+    parse_timestamp = _TimestampParser()
+    margin_micros = WINDOW_MARGIN // _ONE_MICROSECOND
+    running_max = None
+    for value in columns[column_names.index(timestamp_column)]:
+        micros = parse_timestamp(value) if value else None
+        if micros is None:
+            continue
+        if running_max is not None and micros < running_max - margin_micros:
+            print(f"DEBUG_GSU: Windowed read of '{sheet.title}' found a row out of date order. Falling back to a full read.")
+            return None
+        running_max = micros if running_max is None else max(running_max, micros)
+
+    print(f"DEBUG_GSU: Windowed read of '{sheet.title}' starts at row {start_row}.")
+    return columns
+
+
+def _use_windowed_reads():
+    """LEADERBOARD_READ_MODE is 'windowed' (default) or 'full'."""
+    return settings.get().leaderboard_read_mode != "full"
+
+
+async def _compute_sales_aggregates(sheet, timeframe):
+    """
+    Fetches one sheet and aggregates it for the timeframe, before padding and sorting.
+    Returns (leaderboard, recently_active_names, title_period), or None if the sheet has no sales rows.
+    Raises RuntimeError if the columns can't be read, so a failed read isn't mistaken for an empty board.
+    """
+    timestamp_column, first_name_column, premium_column = settings.get().columns.tracked
+
+    eastern_tz = ZoneInfo("America/New_York")
+    today = datetime.now(eastern_tz)
+    start_of_period, end_of_period, title_period = get_leaderboard_period(timeframe, today)
+    two_weeks_ago = today - timedelta(days=14)
+
+    # Only the three columns the leaderboard reads are downloaded, and normally only the recent rows:
+    # nothing older than the period start or the two-week activity window can affect the board.
+    column_names = [timestamp_column, first_name_column, premium_column]
+    columns = None
+    if _use_windowed_reads():
+        columns = await get_windowed_columns(sheet, column_names, timestamp_column, min(start_of_period, two_weeks_ago))
+    if columns is None:
+        columns = await get_projected_columns(sheet, column_names, start_row=2)
+    if columns is None:
+        raise RuntimeError(f"columns {column_names} couldn't be read from '{sheet.title}'")
+    if not columns[0]:
+        print("DEBUG_GSU: No sales data returned for leaderboard.")
+        return None
+    timestamps, names, premiums = columns
+
+    print(f"DEBUG_GSU: Calculating leaderboard for {title_period}: {start_of_period.strftime('%Y-%m-%d')} to {end_of_period.strftime('%Y-%m-%d')}")
+    print(f"DEBUG_GSU: Checking for recent activity since: {two_weeks_ago.strftime('%Y-%m-%d')}")
+
+    leaderboard, recently_active_names = await run_offloaded(
+        aggregate_sales_columns, timestamps, names, premiums, start_of_period, end_of_period, two_weeks_ago,
+        rows=len(timestamps), use_process=True, cancellable=True
+    )
+
+    print(f"DEBUG_GSU: Found {len(leaderboard)} people with sales this {title_period.lower()}.")
+    print(f"DEBUG_GSU: Found {len(recently_active_names)} people with sales in the last two weeks.")
+    return leaderboard, recently_active_names, title_period
+
+
+async def get_sales_leaderboard_data(sheet, timeframe='weekly'):
+    """
+    Fetches and processes sales data for the specified timeframe's leaderboard.
+    Timeframe can be 'weekly' or 'monthly'.
+    Fills remaining slots with salespeople who have had activity in the last two weeks.
+    """
+    aggregates = await _compute_sales_aggregates(sheet, timeframe)
+    if aggregates is None:
+        return {}
+    leaderboard, recently_active_names, title_period = aggregates
+
+    sorted_leaderboard = finalize_leaderboard(leaderboard, recently_active_names)
 
     print(f"DEBUG_GSU: Final {title_period} leaderboard data after filling and sorting: {sorted_leaderboard}")
     return sorted_leaderboard
 
 
+async def get_leaderboard_from_parsed_rows(parsed_rows, timeframe='weekly'):
+    """Builds a finished leaderboard from cached parsed rows (see sheet_diff.SalesSheetIndex) without fetching."""
+    today = datetime.now(ZoneInfo("America/New_York"))
+    start_of_period, end_of_period, _ = get_leaderboard_period(timeframe, today)
+    leaderboard, recently_active_names = await run_offloaded(
+        aggregate_parsed_sales, parsed_rows, start_of_period, end_of_period, today - timedelta(days=14),
+        rows=len(parsed_rows), cancellable=True
+    )
+    return finalize_leaderboard(leaderboard, recently_active_names)
+
+
+async def get_org_leaderboard_data(sheets, timeframe='weekly'):
+    """
+    Builds one combined leaderboard across several team sheets.
+    Each sheet is fetched concurrently and totals for the same salesperson are added together
+    before the usual padding, sorting and top-20 cut.
+    """
+    results = await asyncio.gather(*(_compute_sales_aggregates(sheet, timeframe) for sheet in sheets))
+
+    combined = {}
+    recently_active_names = {}
+    for aggregates in results:
+        if aggregates is None:
+            continue
+        leaderboard, recent_names, _ = aggregates
+        for name, data in leaderboard.items():
+            totals = combined.setdefault(name, {"premium": 0.0, "apps": 0})
+            totals["premium"] += data["premium"]
+            totals["apps"] += data["apps"]
+        recently_active_names.update(recent_names)
+
+    if not combined and not recently_active_names:
+        return {}
+
+    sorted_leaderboard = finalize_leaderboard(combined, recently_active_names)
+    print(f"DEBUG_GSU: Final org-wide {timeframe} leaderboard across {len(sheets)} sheets: {sorted_leaderboard}")
+    return sorted_leaderboard
+
+
 # async def get_weekly_leaderboard_data(sheet):
 #     """
 #     Fetches and processes sales data for the current week's leaderboard.
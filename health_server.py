@@ -0,0 +1,41 @@
+import json
+
+from aiohttp import web
+
+
+class HealthServer:
+    """
+    Small local HTTP server for a process supervisor.
+    GET /health always answers 200 with the full report while the event loop is responsive, so a
+    timeout means the bot is stuck. GET /ready answers 200 only while report["ready"] is true, 503 otherwise.
+    """
+
+    def __init__(self, build_report, host="127.0.0.1", port=8080):
+        self.build_report = build_report
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/health", self._health)
+        app.router.add_get("/ready", self._ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"Health endpoint listening on http://{self.host}:{self.port}/health")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _respond(self, report, status):
+        return web.Response(status=status, text=json.dumps(report, indent=2, default=str), content_type="application/json")
+
+    async def _health(self, request):
+        return self._respond(self.build_report(), 200)
+
+    async def _ready(self, request):
+        report = self.build_report()
+        return self._respond(report, 200 if report.get("ready") else 503)
@@ -0,0 +1,108 @@
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sales_sources import SalesSource
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_leaderboard (
+    channel_id INTEGER NOT NULL,
+    board TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    content_hash TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, board)
+);
+"""
+
+
+@dataclass(frozen=True)
+class LiveLeaderboardTarget:
+    """A channel that keeps one leaderboard message up to date. source None is the org-wide board."""
+    channel_id: int
+    timeframe: str
+    source: Optional[SalesSource] = None
+
+    @property
+    def board(self):
+        """Stable key for the board shown, e.g. 'weekly:Team A' or 'monthly:' for org-wide."""
+        return f"{self.timeframe}:{self.source.name if self.source else ''}"
+
+
+def parse_live_leaderboard_targets(value, sources):
+    """
+    Parses LIVE_LEADERBOARDS: comma-separated "channel_id:timeframe[:team name]" entries, e.g.
+    "111:weekly,111:monthly,222:weekly:Team A". Without a team name the board covers every team
+    (the only team when just one is configured). Bad entries are reported and skipped.
+    """
+    targets = []
+    sources_by_name = {source.name: source for source in sources}
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        channel_str, _, rest = entry.partition(":")
+        timeframe, _, team_name = rest.partition(":")
+        timeframe = timeframe.strip().lower()
+        try:
+            channel_id = int(channel_str)
+        except ValueError:
+            print(f"Error: LIVE_LEADERBOARDS entry '{entry}' doesn't start with a valid channel ID. Skipping it.")
+            continue
+        if timeframe not in ("weekly", "monthly"):
+            print(f"Error: LIVE_LEADERBOARDS entry '{entry}' needs 'weekly' or 'monthly'. Skipping it.")
+            continue
+
+        team_name = team_name.strip()
+        if team_name:
+            source = sources_by_name.get(team_name)
+            if source is None:
+                print(f"Error: LIVE_LEADERBOARDS entry '{entry}' names an unknown team. Skipping it.")
+                continue
+        else:
+            source = sources[0] if len(sources) == 1 else None
+        targets.append(LiveLeaderboardTarget(channel_id, timeframe, source))
+    return targets
+
+
+class LiveLeaderboardStore:
+    """
+    Remembers the message behind each live leaderboard, and a fingerprint of what it currently shows,
+    in the bot's SQLite state file so the same message keeps being edited after a restart.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, target):
+        """Returns (message_id, content_hash), or None if the board has no message yet."""
+        row = self._conn.execute(
+            "SELECT message_id, content_hash FROM live_leaderboard WHERE channel_id = ? AND board = ?",
+            (target.channel_id, target.board)
+        ).fetchone()
+        return (row["message_id"], row["content_hash"]) if row else None
+
+    def save(self, target, message_id, content_hash):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO live_leaderboard (channel_id, board, message_id, content_hash, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(channel_id, board) DO UPDATE SET message_id = excluded.message_id, "
+                "content_hash = excluded.content_hash, updated_at = excluded.updated_at",
+                (target.channel_id, target.board, message_id, content_hash, time.time())
+            )
+
+    def delete(self, target):
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM live_leaderboard WHERE channel_id = ? AND board = ?",
+                (target.channel_id, target.board)
+            )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import settings
+
+
+# Upper bounds (ms) of the lag histogram buckets; anything slower lands in the last, open-ended bucket.
+LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag and names whatever is blocking the loop.
+
+    A heartbeat coroutine sleeps for `interval` seconds and records how late it wakes up (the lag)
+    in a histogram. A daemon thread watches the heartbeat; if it hasn't ticked for `threshold`
+    seconds the loop is stuck, so the thread grabs the loop thread's current stack with
+    sys._current_frames() and logs it. That stack ends in the call that is blocking, e.g. a
+    synchronous HTTP request inside a coroutine. Both parts wake a few times a second at most,
+    so it is cheap enough to leave on in production.
+    """
+
+    def __init__(self, interval=0.25, threshold=0.5, export_path=None, report_every=300):
+        self.interval = interval
+        self.threshold = threshold
+        self.export_path = export_path
+        self.report_every = report_every
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag_ms = 0.0
+        self.samples = 0
+        self.stalls = deque(maxlen=20)
+        self._last_tick = time.monotonic()
+        self._current_stall = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts watching the running event loop. Safe to call more than once."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"Loop watchdog started (stall threshold {self.threshold * 1000:.0f} ms).")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        last_report = time.monotonic()
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - before - self.interval) * 1000)
+            with self._lock:
+                self._last_tick = now
+                self._record(lag_ms)
+                stall = self._current_stall
+                self._current_stall = None
+            if stall is not None:
+                stall["duration_ms"] = round(lag_ms + self.interval * 1000)
+                print(f"LOOP_WATCHDOG: Event loop was blocked for {stall['duration_ms']} ms.")
+
+            if now - last_report >= self.report_every:
+                last_report = now
+                self.report()
+
+    def _record(self, lag_ms):
+        self.samples += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.histogram[i] += 1
+                return
+        self.histogram[-1] += 1
+
+    def _monitor(self):
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(check_every):
+            with self._lock:
+                blocked_for = time.monotonic() - self._last_tick - self.interval
+                if blocked_for < self.threshold or self._current_stall is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "<loop thread stack unavailable>"
+                self._current_stall = {
+                    "detected_at": time.time(),
+                    "blocked_for_ms": round(blocked_for * 1000),
+                    "stack": stack,
+                }
+                self.stalls.append(self._current_stall)
+            print(f"LOOP_WATCHDOG: Event loop blocked for over {blocked_for * 1000:.0f} ms. Loop thread stack:\n{stack}")
+
+    def snapshot(self):
+        """Current stats as a JSON-serialisable dict."""
+        with self._lock:
+            buckets = {f"<={bound}ms": count for bound, count in zip(LAG_BUCKETS_MS, self.histogram)}
+            buckets[f">{LAG_BUCKETS_MS[-1]}ms"] = self.histogram[-1]
+            return {
+                "samples": self.samples,
+                "max_lag_ms": round(self.max_lag_ms, 1),
+                "threshold_ms": round(self.threshold * 1000),
+                "histogram": buckets,
+                "recent_stalls": list(self.stalls),
+            }
+
+    def report(self):
+        """Logs a one-line summary and, if export_path is set, writes the full snapshot there as JSON."""
+        snapshot = self.snapshot()
+        slow = sum(count for bound, count in zip(LAG_BUCKETS_MS, self.histogram) if bound > 100) + self.histogram[-1]
+        print(f"LOOP_WATCHDOG: {snapshot['samples']} samples, max lag {snapshot['max_lag_ms']} ms, "
+              f"{slow} over 100 ms, {len(snapshot['recent_stalls'])} recent stalls.")
+        if self.export_path:
+            tmp_path = f"{self.export_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, indent=2)
+                os.replace(tmp_path, self.export_path)
+            except OSError as e:
+                print(f"LOOP_WATCHDOG: Couldn't write {self.export_path}: {e}")
+
+
+def create_watchdog_from_env():
+    """Builds the watchdog from settings, or returns None when LOOP_WATCHDOG_ENABLED is false."""
+    config = settings.get()
+    if not config.loop_watchdog_enabled:
+        return None
+    return LoopWatchdog(threshold=config.loop_lag_threshold_ms / 1000, export_path=config.loop_watchdog_export_file)
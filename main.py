@@ -1,36 +1,89 @@
-from datetime import datetime as dt, time, timedelta
+from datetime import datetime as dt, timedelta
 import discord
 from discord.ext import commands, tasks
 from discord import ui
 import gspread
-from dotenv import load_dotenv
 import google_sheet_utils as gsu
+import settings
+from notification_outbox import NotificationOutbox, make_row_key
+from sheet_diff import SalesSheetIndex
+from loop_watchdog import create_watchdog_from_env
+from scheduler import JobScheduler, ScheduledJob, parse_schedule
+from memory_report import build_memory_report, format_memory_report
+from live_leaderboard import LiveLeaderboardStore, parse_live_leaderboard_targets
+from health_server import HealthServer
+from sales_export import EXPORT_PERIODS, ExportFilters, export_sales, parquet_available
 import asyncio
+import hashlib
+import json
 import os
+import signal
 import traceback
 from zoneinfo import ZoneInfo
 import requests
 import google.generativeai as genai
 import random
+import tempfile
 
 
-load_dotenv()
+# --- Settings (read from .env once and validated; SIGHUP reloads them, see reload_settings) ---
+startup_settings = settings.get()
 
 # --- Gemini AI Setup ---
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+if startup_settings.gemini_api_key:
+    genai.configure(api_key=startup_settings.gemini_api_key)
 
 # --- Bot Setup ---
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-intents.messages = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+if startup_settings.low_memory_mode:
+    # Only the events the bot handles: guilds (channel lookups), member joins, guild commands and DMs.
+    # Members aren't cached (on_member_join gets the member from the event), guilds aren't chunked
+    # at startup, and only a few recent messages are kept.
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.members = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    max_messages = startup_settings.low_memory_max_messages
+    bot = commands.Bot(
+        command_prefix="!", intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False,
+        max_messages=max_messages if max_messages > 0 else None,
+    )
+    print(f"Low-memory mode: minimal intents, no member cache, message cache of {max(max_messages, 0)}.")
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    intents.messages = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+
+# --- Event-loop lag watchdog (logs the stack of anything that blocks the loop) ---
+loop_watchdog_g = create_watchdog_from_env()
+
+# --- Sales sources (one per team worksheet) ---
+sales_sources_g = list(startup_settings.sales_sources)
 
 # --- Global state for polling ---
-last_known_row_count_g = 1
-initial_check_done = False
+# Keyed by source name. A source is only polled once its initial row count is known.
+last_known_row_count_g = {}
+# Keyed by source name. Row hashes and parsed rows from the last poll, used to tell appends from edits and deletions.
+sheet_indexes_g = {}
+
+# Sale notifications are queued here and sent by drain_notification_outbox, so a failed send or a restart
+# doesn't lose them. The row cursors are saved in the same file.
+notification_outbox_g = NotificationOutbox(startup_settings.state_db_path)
+
+# --- Leaderboard cache (filled ahead of scheduled posts, served stale while Sheets is slow or down) ---
+# Keyed by (source name, or None for org-wide, timeframe). Values are (computed_at, period_start, leaderboard_data).
+leaderboard_cache_g = {}
+# Same keys. The refresh currently running for each entry, so concurrent callers share one fetch.
+leaderboard_refreshes_g = {}
+# Same keys. (failed_at, error) of the last refresh that failed, for the health endpoint.
+leaderboard_refresh_errors_g = {}
+# Keyed by source name. When each team's sheet was last polled successfully.
+last_successful_poll_g = {}
 
 # --- Onboarding Modal ---
 class OnboardingModal(ui.Modal, title="Welcome to the JW Discord!"):
@@ -44,7 +97,7 @@ class OnboardingModal(ui.Modal, title="Welcome to the JW Discord!"):
     phone = ui.TextInput(label='Phone Number (Optional)', placeholder='Enter your phone number...', required=False)
 
     async def on_submit(self, interaction: discord.Interaction):
-        webhook_url = os.getenv("ONBOARDING_WEBHOOK_URL")
+        webhook_url = settings.get().onboarding_webhook_url
         data = {
             "full_name": self.full_name.value,
             "email": self.email.value,
@@ -78,11 +131,31 @@ async def on_member_join(member):
 
 # -- Leaderboard Timeframe View --
 class LeaderboardTimeframeView(ui.View):
-    """View with a dropdown to select weekly or monthly leaderboard."""
+    """View with a dropdown to select weekly or monthly leaderboard, plus a team dropdown when several teams are configured."""
+    ORG_WIDE_VALUE = "__org__"
+
     def __init__(self):
         super().__init__(timeout=180)
+        self.selected_source = None
+        if len(sales_sources_g) > 1:
+            team_select = ui.Select(
+                placeholder="All Teams (Org-Wide)",
+                options=[discord.SelectOption(label="All Teams (Org-Wide)", value=self.ORG_WIDE_VALUE, emoji='🌎')] + [
+                    discord.SelectOption(label=source.name, value=source.name) for source in sales_sources_g[:24]
+                ],
+                row=1
+            )
+            team_select.callback = self.team_callback
+            self.team_select = team_select
+            self.add_item(team_select)
+
+    async def team_callback(self, interaction: discord.Interaction):
+        value = self.team_select.values[0]
+        self.selected_source = next((source for source in sales_sources_g if source.name == value), None)
+        await interaction.response.defer()
 
     @ui.select(
+        row=0,
         cls=ui.Select,
         placeholder="Select Leaderboard Timeframe...",
         options=[
@@ -101,67 +174,395 @@ class LeaderboardTimeframeView(ui.View):
         )
 
         channel = interaction.channel
-        await generate_and_post_leaderboard(channel, timeframe)
+        await generate_and_post_leaderboard(channel, timeframe, self.selected_source)
+
+
+# --- Helper to move a source's row cursor (in memory and on disk) ---
+def advance_row_count(source, index):
+    """Saves the index's row count and row fingerprints, so a restart resumes from exactly this state."""
+    last_known_row_count_g[source.name] = index.row_count
+    notification_outbox_g.set_cursor(source.name, index.row_count, index.fingerprints)
+
 
+# --- Helper to fetch just the columns the poller tracks ---
+def get_tracked_columns() -> list:
+    """The columns that identify a sale for change detection and leaderboards."""
+    return settings.get().columns.tracked
 
-# -- Helper to check for first sale ---
-def is_first_sale(salesperson_name: str, all_sales_data: list, headers: list, first_name_column: str, current_sale_row_index: int) -> bool:
+
+async def fetch_tracked_rows(sheet):
     """
-    Checks if this is the first sale for a given salesperson by looking at historical sales data.
+    Returns the tracked columns as rows (header row first), or None if they can't be fetched.
+    Only these few columns are downloaded; full rows are fetched separately for new sales.
     """
-    name_col_idx = -1
-    try:
-        name_col_idx = headers.index(first_name_column)
-    except ValueError:
-        return False
-
-    for i in range(1, current_sale_row_index):
-        if i < len(all_sales_data):
-            previous_sale_row = all_sales_data[i]
-            if len(previous_sale_row) > name_col_idx:
-                if previous_sale_row[name_col_idx] == salesperson_name:
-                    return False
-    return True
+    columns = await gsu.get_projected_columns(sheet, get_tracked_columns())
+    if columns is None:
+        return None
+    return [list(row) for row in zip(*columns)]
 
 
 # --- Helper to initialize last_known_row_count ---
-async def initialize_row_count():
-    global last_known_row_count_g, initial_check_done
-    sheet = await gsu.get_sheet()
+async def initialize_row_count(source):
+    sheet = await gsu.get_sheet(source)
     if sheet:
         try:
-            all_values = await sheet.get_all_values()
-            last_known_row_count_g = len(all_values)
-            print(f"Initial row count set to: {last_known_row_count_g}")
-            initial_check_done = True
+            all_values = await fetch_tracked_rows(sheet)
+            if all_values is None:
+                raise ValueError(f"Tracked columns {get_tracked_columns()} are missing from the sheet")
+            index = SalesSheetIndex(*get_tracked_columns())
+            saved_fingerprints = notification_outbox_g.get_fingerprints(source.name)
+            saved_row_count = notification_outbox_g.get_cursor(source.name)
+            if saved_fingerprints is not None:
+                # Resume from the rows seen by the last run. The first poll diffs the sheet against them, so sales
+                # added while the bot was down get announced even if rows were also inserted or deleted meanwhile.
+                await gsu.run_offloaded(index.resume, all_values, saved_fingerprints, rows=len(all_values))
+                sheet_indexes_g[source.name] = index
+                last_known_row_count_g[source.name] = index.row_count
+                print(f"[{source.name}] Resuming from the {index.row_count - 1} rows saved by the last run (sheet now has {len(all_values) - 1})")
+            elif saved_row_count is not None and saved_row_count <= len(all_values):
+                # State saved before row fingerprints were kept: resume from the saved row count instead.
+                await gsu.run_offloaded(index.update, all_values[:saved_row_count], rows=saved_row_count)
+                sheet_indexes_g[source.name] = index
+                last_known_row_count_g[source.name] = saved_row_count
+                print(f"[{source.name}] Resuming from saved row count {saved_row_count} (sheet now has {len(all_values)} rows)")
+            else:
+                await gsu.run_offloaded(index.update, all_values, rows=len(all_values))
+                sheet_indexes_g[source.name] = index
+                advance_row_count(source, index)
+                print(f"[{source.name}] Initial row count set to: {last_known_row_count_g[source.name]}")
         except gspread.exceptions.APIError as e:
-            print(f"Error initializing row count: {e}. Retrying in 60 seconds.")
+            print(f"[{source.name}] Error initializing row count: {e}. Retrying in 60 seconds.")
             await asyncio.sleep(60)
-            await initialize_row_count()
+            await initialize_row_count(source)
         except Exception as e:
-            print(f"An unexpected error occurred during row count initialization: {e}")
-            last_known_row_count_g = 1
-            initial_check_done = False
+            print(f"[{source.name}] An unexpected error occurred during row count initialization: {e}")
+            last_known_row_count_g.pop(source.name, None)
+            sheet_indexes_g.pop(source.name, None)
     else:
-        print("Sheet not available during initial row count check. Retrying in 60 seconds.")
+        print(f"[{source.name}] Sheet not available during initial row count check. Retrying in 60 seconds.")
         await asyncio.sleep(60)
-        await initialize_row_count()
+        await initialize_row_count(source)
+
+
+# --- Helpers for team and org-wide leaderboards ---
+async def get_leaderboard_sheets(source=None):
+    """
+    Opens the worksheet for 'source', or every team's worksheet concurrently when 'source' is None.
+    Teams whose sheet can't be opened are logged and left out of the returned list.
+    """
+    sources = [source] if source else sales_sources_g
+    sheets = await asyncio.gather(*(gsu.get_sheet(s) for s in sources))
+    for s, sheet in zip(sources, sheets):
+        if not sheet:
+            print(f"[{s.name}] Sheet not available for leaderboard.")
+    return [sheet for sheet in sheets if sheet]
+
+
+async def get_leaderboard_data(sheets: list, timeframe: str):
+    """Returns one team's leaderboard for a single sheet, or the combined org-wide board for several."""
+    if len(sheets) == 1:
+        return await gsu.get_sales_leaderboard_data(sheets[0], timeframe)
+    return await gsu.get_org_leaderboard_data(sheets, timeframe)
+
+
+def get_indexed_parsed_rows(source=None):
+    """The poller's parsed rows for 'source' (every team when None), or None if a team on the board isn't indexed yet."""
+    sources = [source] if source else sales_sources_g
+    indexes = [sheet_indexes_g.get(s.name) for s in sources]
+    if any(index is None for index in indexes):
+        return None
+    return indexes[0].parsed_rows if len(indexes) == 1 else [row for index in indexes for row in index.parsed_rows]
+
+
+def leaderboard_cache_key(timeframe: str, source=None):
+    return (source.name if source else None, timeframe)
+
+
+async def refresh_leaderboard_cache(timeframe: str, source=None):
+    """
+    Builds a leaderboard and stores it in leaderboard_cache_g. Returns the data, or None if it couldn't be built.
+    Boards whose teams are all indexed by the poller are built from its parsed rows; others are fetched from Sheets.
+    If a refresh of the same board is already running, waits for that one instead of starting another.
+    """
+    key = leaderboard_cache_key(timeframe, source)
+    task = leaderboard_refreshes_g.get(key)
+    if task is None or task.done():
+        task = asyncio.create_task(_load_leaderboard_into_cache(key, timeframe, source))
+        leaderboard_refreshes_g[key] = task
+    return await asyncio.shield(task)
+
+
+async def _load_leaderboard_into_cache(key, timeframe: str, source):
+    # Failures are logged and recorded here rather than raised, since many refreshes run in the background.
+    try:
+        parsed_rows = get_indexed_parsed_rows(source)
+        if parsed_rows is not None:
+            # The index is at most one poll old, so no Sheets call is needed.
+            leaderboard_data = await gsu.get_leaderboard_from_parsed_rows(parsed_rows, timeframe)
+        else:
+            sheets = await get_leaderboard_sheets(source)
+            expected = 1 if source else len(sales_sources_g)
+            if len(sheets) < expected:
+                # A board missing some teams would replace the last good one, so it counts as a failure.
+                raise RuntimeError(f"{expected - len(sheets)} of {expected} sheets not available")
+            leaderboard_data = await get_leaderboard_data(sheets, timeframe)
+    except Exception as e:
+        print(f"Error refreshing {timeframe} leaderboard for {key[0] or 'all teams'}: {e}")
+        leaderboard_refresh_errors_g[key] = (dt.now(ZoneInfo("America/New_York")), str(e))
+        return None
+    now = dt.now(ZoneInfo("America/New_York"))
+    period_start, _, _ = gsu.get_leaderboard_period(timeframe, now)
+    leaderboard_cache_g[key] = (now, period_start, leaderboard_data)
+    leaderboard_refresh_errors_g.pop(key, None)
+    return leaderboard_data
+
+
+def get_current_cache_entry(timeframe: str, source=None):
+    """The cached (computed_at, leaderboard_data) if it still covers the current period, else None."""
+    entry = leaderboard_cache_g.get(leaderboard_cache_key(timeframe, source))
+    if entry is None:
+        return None
+    computed_at, period_start, leaderboard_data = entry
+    if gsu.get_leaderboard_period(timeframe, dt.now(ZoneInfo("America/New_York")))[0] != period_start:
+        return None
+    return computed_at, leaderboard_data
+
+
+async def get_leaderboard_stale_while_revalidate(timeframe: str, source=None, max_cache_age: timedelta = None):
+    """
+    Returns (leaderboard_data, computed_at), or (None, None) if there is no data at all.
+    A cached board younger than 'max_cache_age' (LEADERBOARD_FRESH_SECONDS by default) is returned as is.
+    An older one is returned straight away while a refresh runs in the background, unless 'max_cache_age'
+    was given (scheduled posts), in which case the refresh is awaited and the old board is only the
+    fallback if Sheets fails. Nothing cached means waiting for Sheets.
+    """
+    fresh_for = max_cache_age if max_cache_age is not None else timedelta(seconds=settings.get().leaderboard_fresh_seconds)
+    entry = get_current_cache_entry(timeframe, source)
+    now = dt.now(ZoneInfo("America/New_York"))
+    if entry is not None:
+        computed_at, leaderboard_data = entry
+        if now - computed_at <= fresh_for:
+            return leaderboard_data, computed_at
+        if max_cache_age is None:
+            asyncio.create_task(refresh_leaderboard_cache(timeframe, source))
+            return leaderboard_data, computed_at
+
+    await refresh_leaderboard_cache(timeframe, source)
+    entry = get_current_cache_entry(timeframe, source) or entry
+    if entry is None:
+        return None, None
+    computed_at, leaderboard_data = entry
+    return leaderboard_data, computed_at
+
+
+def refresh_cached_leaderboards_for(source):
+    """After a team's sheet changes, rebuilds (in the background, from the poller's index) every cached board that includes that team."""
+    for key in list(leaderboard_cache_g):
+        source_name, timeframe = key
+        if source_name is None:
+            asyncio.create_task(refresh_leaderboard_cache(timeframe, None))
+        elif source_name == source.name:
+            asyncio.create_task(refresh_leaderboard_cache(timeframe, source))
+
+
+# --- Leaderboard embed ---
+def build_leaderboard_embed(leaderboard_data: dict, timeframe: str = "weekly", source=None, updated_at=None):
+    """
+    Builds the leaderboard embed for non-empty 'leaderboard_data', or returns None if nothing fits on it.
+    'updated_at' is when the data was computed (now by default); data older than LEADERBOARD_FRESH_SECONDS
+    gets its age added to the footer.
+    """
+    eastern_tz = ZoneInfo("America/New_York")
+    today = updated_at or dt.now(eastern_tz)
+    age = dt.now(eastern_tz) - today
+
+    # Only label boards by team when there is more than one team to tell apart.
+    board_label = "" if len(sales_sources_g) == 1 else f"{source.name if source else 'Org-Wide'} "
+
+    if timeframe == "monthly":
+        start_of_period = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        title_text = f"📈 {board_label}Monthly Sales Leaderboard 📈"
+        period_text = f"Sales from {start_of_period.strftime('%b %d, %Y')} to {today.strftime('%b %d, %Y')}"
+    else:
+        start_of_period = today - timedelta(days=today.weekday())
+        start_of_period = start_of_period.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_period = start_of_period + timedelta(days=6)
+        title_text = f"🏆 {board_label}Weekly Sales Leaderboard 🏆"
+        period_text = f"Sales from {start_of_period.strftime('%b %d, %Y')} to {end_of_period.strftime('%b %d, %Y')}"
+    
+    now_est = today
+
+    team_total = sum(data['premium'] for data in leaderboard_data.values())
+
+    embed = discord.Embed(
+        title=title_text,
+        description=period_text,
+        color=discord.Color.gold()
+    )
+    age_text = f" ({int(age.total_seconds() // 60)} min ago)" if age.total_seconds() > settings.get().leaderboard_fresh_seconds else ""
+    embed.set_footer(text=f"Total Production: ${team_total:,.2f}\nLast updated: {now_est.strftime('%Y-%m-%d %I:%M %p %Z')}{age_text}")
+    
+    custom_dbab_emoji = "<:DBAB:1369689466708557896>"
+    custom_domore_emoji = "<:DOMOREGSD:1387049213686452245>"
+
+    if timeframe == "monthly":
+        club_40k = []
+        club_30k = []
+        club_20k = []
+        club_10k = []
+        club_dbab = []
+        club_broke = []
+
+        for name, data in leaderboard_data.items():
+            premium = data["premium"]
+            if premium >= 40000:
+                club_40k.append((name, data))
+            elif premium >= 30000:
+                club_30k.append((name, data))
+            elif premium >= 20000:
+                club_20k.append((name, data))
+            elif premium >= 10000:
+                club_10k.append((name, data))
+            elif premium >= 5000:
+                club_dbab.append((name, data))
+            else:
+                club_broke.append((name, data))
+        
+        all_clubs = [
+            ("\n--- 🚀 40K CLUB 🚀 ---", club_40k),
+            ("\n--- 👑 30K CLUB 👑 ---", club_30k),
+            ("\n--- ⭐ 20K CLUB ⭐ ---", club_20k),
+            ("\n--- 📈 10K CLUB 📈 ---", club_10k),
+            (f"\n--- {custom_dbab_emoji} DBAB {custom_dbab_emoji} ---", club_dbab),
+            ("\n--- 😞 BROKE 😞 ---", club_broke)
+        ]
+
+    else: 
+        twenty_k_club = []
+        ten_k_club =[]
+        five_k_club = []
+        main_board = []
+        zero_board = []
+
+        for name, data in leaderboard_data.items():
+            premium = data["premium"]
+            if premium >= 20000:
+                twenty_k_club.append((name, data))
+            elif premium >= 10000:
+                ten_k_club.append((name, data))
+            elif premium >= 5000:
+                five_k_club.append((name, data))
+            elif premium > 0:
+                main_board.append((name, data))
+            else:
+                zero_board.append((name, data))
+        
+        all_clubs = [
+            ("\n--- 🚀 20K CLUB 🚀 ---", twenty_k_club),
+            ("\n--- 👑 10K CLUB 👑 ---", ten_k_club),
+            ("\n--- ⭐ 5K CLUB ⭐ ---", five_k_club),
+            (f"\n--- {custom_dbab_emoji} DBAB {custom_dbab_emoji} ---", main_board),
+            ("\n--- 😴 SLACKERS 😴 ---", zero_board)
+        ]
+
+    position = 1
+    # This counter tracks all fields added to the embed, including club titles and individual members. Discord's API has a limit of 25 fields per embed.
+    total_fields_added = 0
+    # This variable stores the maximum number of fields allowed in a Discord embed.
+    max_fields = 25
+
+    def add_person_to_embed(name, data, rank):
+        nonlocal position 
+        nonlocal total_fields_added
+        if total_fields_added >= max_fields:
+            return
+
+        total_premium = data['premium']
+        num_apps = data['apps']
+        suffix = ""
+
+        if position == 1:
+            prefix = "🥇"
+        elif position == 2:
+            prefix = "🥈"
+        elif position == 3:
+            prefix = "🥉"
+        else:
+            prefix = f"#{rank}"
+        
+        if timeframe == "monthly":
+            if total_premium >= 40000:
+                suffix = "🔥" 
+            elif total_premium >= 30000:
+                suffix = "💎"
+            elif total_premium >= 20000:
+                suffix = "🤯" 
+            elif total_premium >= 10000:
+                suffix = "🏆" 
+            elif total_premium >= 5000:
+                suffix = "🤑" 
+            elif total_premium > 0:
+                suffix = "🤡" 
+            else:
+                suffix = "💤" 
+        else: 
+            if total_premium >= 20000:
+                suffix = "🤯"
+            elif total_premium >= 10000:
+                suffix = "🏆"
+            elif total_premium >= 5000:
+                suffix = "🤑"
+            elif total_premium >= 2500:
+                suffix = custom_domore_emoji
+            elif total_premium >= 1000:
+                suffix = custom_dbab_emoji
+            elif total_premium > 0:
+                suffix = "🤡"
+            else:
+                suffix = "💤"
+
+        apps_text = "App" if num_apps == 1 else "Apps"
+        formatted_premium = f"${total_premium:,.2f}" if isinstance(total_premium, (int, float)) else str(total_premium)
+        embed.add_field(name=f"{prefix} {name} {suffix}", value=f"Total Premium: **{formatted_premium}** | **{num_apps}** {apps_text}", inline=False)
+        total_fields_added += 1
+
+    for title, club_list in all_clubs:
+        if not club_list:
+            continue
+
+        if total_fields_added + 1 <= max_fields:
+            embed.add_field(name=title, value="", inline=False)
+            total_fields_added += 1
+        else:
+            break
+        
+        for name, data in club_list:
+            if total_fields_added >= max_fields:
+                break
+            add_person_to_embed(name, data, position)
+            position += 1
+
+    return embed if embed.fields else None
 
 
 # --- Reusable Leaderboard Function ---
-async def generate_and_post_leaderboard(destination: discord.abc.Messageable, timeframe: str = "weekly"):
+async def generate_and_post_leaderboard(destination: discord.abc.Messageable, timeframe: str = "weekly", source=None,
+                                        max_cache_age: timedelta = None):
     """
     Fetches, formats, and posts the weekly or monthly sales leaderboard to the given destination.
     'destination' can be a TextChannel, commands.Context, or discord.Interaction object.
     'timeframe' is "weekly" or "monthly".
+    'source' is the team to show; None means every team combined (the only team when just one is configured).
+    'max_cache_age', if given, lets a pre-warmed board up to that old be posted without touching the sheet.
+    If Sheets is slow or failing, the last good board is shown with its age (see get_leaderboard_stale_while_revalidate).
     """
 
     if not isinstance(destination, discord.Interaction):
         if isinstance(destination, commands.Context):
             await destination.send(f"Generating {timeframe.capitalize()} leaderboard... 📊", delete_after=15)
-    
-    sheet = await gsu.get_sheet()
-    if not sheet:
+
+    leaderboard_data, computed_at = await get_leaderboard_stale_while_revalidate(timeframe, source, max_cache_age)
+    if leaderboard_data is None:
         error_msg = "Sorry, I couldn't connect to the sales data sheet right now for the leaderboard. Please try again later."
         if isinstance(destination, discord.Interaction):
             await destination.edit_original_response(content=error_msg, view=None)
@@ -170,8 +571,6 @@ async def generate_and_post_leaderboard(destination: discord.abc.Messageable, ti
         return
 
     try:
-        leaderboard_data = await gsu.get_sales_leaderboard_data(sheet, timeframe)
-
         if not leaderboard_data:
             msg = f"No sales recorded yet this {timeframe[:-2]}."
             if isinstance(destination, discord.Interaction):
@@ -180,172 +579,9 @@ async def generate_and_post_leaderboard(destination: discord.abc.Messageable, ti
                 await destination.send(msg)
             return
 
-        eastern_tz = ZoneInfo("America/New_York")
-        today = dt.now(eastern_tz)
-
-        if timeframe == "monthly":
-            start_of_period = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            title_text = "📈 Monthly Sales Leaderboard 📈"
-            period_text = f"Sales from {start_of_period.strftime('%b %d, %Y')} to {today.strftime('%b %d, %Y')}"
-        else:
-            start_of_period = today - timedelta(days=today.weekday())
-            start_of_period = start_of_period.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_period = start_of_period + timedelta(days=6)
-            title_text = "🏆 Weekly Sales Leaderboard 🏆"
-            period_text = f"Sales from {start_of_period.strftime('%b %d, %Y')} to {end_of_period.strftime('%b %d, %Y')}"
-        
-        now_est = today
-
-        team_total = sum(data['premium'] for data in leaderboard_data.values())
+        embed = build_leaderboard_embed(leaderboard_data, timeframe, source, computed_at)
 
-        embed = discord.Embed(
-            title=title_text,
-            description=period_text,
-            color=discord.Color.gold()
-        )
-        embed.set_footer(text=f"Total Production: ${team_total:,.2f}\nLast updated: {now_est.strftime('%Y-%m-%d %I:%M %p %Z')}")
-        
-        custom_dbab_emoji = "<:DBAB:1369689466708557896>"
-        custom_domore_emoji = "<:DOMOREGSD:1387049213686452245>"
-
-        if timeframe == "monthly":
-            club_40k = []
-            club_30k = []
-            club_20k = []
-            club_10k = []
-            club_dbab = []
-            club_broke = []
-
-            for name, data in leaderboard_data.items():
-                premium = data["premium"]
-                if premium >= 40000:
-                    club_40k.append((name, data))
-                elif premium >= 30000:
-                    club_30k.append((name, data))
-                elif premium >= 20000:
-                    club_20k.append((name, data))
-                elif premium >= 10000:
-                    club_10k.append((name, data))
-                elif premium >= 5000:
-                    club_dbab.append((name, data))
-                else:
-                    club_broke.append((name, data))
-            
-            all_clubs = [
-                ("\n--- 🚀 40K CLUB 🚀 ---", club_40k),
-                ("\n--- 👑 30K CLUB 👑 ---", club_30k),
-                ("\n--- ⭐ 20K CLUB ⭐ ---", club_20k),
-                ("\n--- 📈 10K CLUB 📈 ---", club_10k),
-                (f"\n--- {custom_dbab_emoji} DBAB {custom_dbab_emoji} ---", club_dbab),
-                ("\n--- 😞 BROKE 😞 ---", club_broke)
-            ]
-
-        else: 
-            twenty_k_club = []
-            ten_k_club =[]
-            five_k_club = []
-            main_board = []
-            zero_board = []
-
-            for name, data in leaderboard_data.items():
-                premium = data["premium"]
-                if premium >= 20000:
-                    twenty_k_club.append((name, data))
-                elif premium >= 10000:
-                    ten_k_club.append((name, data))
-                elif premium >= 5000:
-                    five_k_club.append((name, data))
-                elif premium > 0:
-                    main_board.append((name, data))
-                else:
-                    zero_board.append((name, data))
-            
-            all_clubs = [
-                ("\n--- 🚀 20K CLUB 🚀 ---", twenty_k_club),
-                ("\n--- 👑 10K CLUB 👑 ---", ten_k_club),
-                ("\n--- ⭐ 5K CLUB ⭐ ---", five_k_club),
-                (f"\n--- {custom_dbab_emoji} DBAB {custom_dbab_emoji} ---", main_board),
-                ("\n--- 😴 SLACKERS 😴 ---", zero_board)
-            ]
-
-        position = 1
-        # This counter tracks all fields added to the embed, including club titles and individual members. Discord's API has a limit of 25 fields per embed.
-        total_fields_added = 0
-        # This variable stores the maximum number of fields allowed in a Discord embed.
-        max_fields = 25
-
-        def add_person_to_embed(name, data, rank):
-            nonlocal position 
-            nonlocal total_fields_added
-            if total_fields_added >= max_fields:
-                return
-
-            total_premium = data['premium']
-            num_apps = data['apps']
-            suffix = ""
-
-            if position == 1:
-                prefix = "🥇"
-            elif position == 2:
-                prefix = "🥈"
-            elif position == 3:
-                prefix = "🥉"
-            else:
-                prefix = f"#{rank}"
-            
-            if timeframe == "monthly":
-                if total_premium >= 40000:
-                    suffix = "🔥" 
-                elif total_premium >= 30000:
-                    suffix = "💎"
-                elif total_premium >= 20000:
-                    suffix = "🤯" 
-                elif total_premium >= 10000:
-                    suffix = "🏆" 
-                elif total_premium >= 5000:
-                    suffix = "🤑" 
-                elif total_premium > 0:
-                    suffix = "🤡" 
-                else:
-                    suffix = "💤" 
-            else: 
-                if total_premium >= 20000:
-                    suffix = "🤯"
-                elif total_premium >= 10000:
-                    suffix = "🏆"
-                elif total_premium >= 5000:
-                    suffix = "🤑"
-                elif total_premium >= 2500:
-                    suffix = custom_domore_emoji
-                elif total_premium >= 1000:
-                    suffix = custom_dbab_emoji
-                elif total_premium > 0:
-                    suffix = "🤡"
-                else:
-                    suffix = "💤"
-
-            apps_text = "App" if num_apps == 1 else "Apps"
-            formatted_premium = f"${total_premium:,.2f}" if isinstance(total_premium, (int, float)) else str(total_premium)
-            embed.add_field(name=f"{prefix} {name} {suffix}", value=f"Total Premium: **{formatted_premium}** | **{num_apps}** {apps_text}", inline=False)
-            total_fields_added += 1
-
-        for title, club_list in all_clubs:
-            if not club_list:
-                continue
-
-            if total_fields_added + 1 <= max_fields:
-                embed.add_field(name=title, value="", inline=False)
-                total_fields_added += 1
-            else:
-                break
-            
-            for name, data in club_list:
-                if total_fields_added >= max_fields:
-                    break
-                add_person_to_embed(name, data, position)
-                position += 1
-
-        if not embed.fields:
+        if embed is None:
             msg = f"No sales data found for the current {timeframe[:-2]} to display on the leaderboard."
             if isinstance(destination, discord.Interaction):
                 await destination.edit_original_response(content=msg, view=None)
@@ -378,96 +614,342 @@ async def generate_and_post_leaderboard(destination: discord.abc.Messageable, ti
         traceback.print_exc()
 
 
+# --- Live leaderboards (one message per channel, edited in place as sales come in) ---
+live_leaderboard_targets_g = parse_live_leaderboard_targets(startup_settings.live_leaderboards, sales_sources_g)
+live_leaderboard_store_g = LiveLeaderboardStore(startup_settings.state_db_path)
+# Boards waiting to be re-rendered, and the event-loop time each was last rendered (for the debounce).
+live_leaderboard_dirty_g = set(live_leaderboard_targets_g)
+live_leaderboard_last_render_g = {}
+# Boards are re-rendered this often even without new sales, so a new week or month shows up. Unchanged boards aren't edited.
+LIVE_LEADERBOARD_RECHECK_SECONDS = 900
+
+
+def mark_live_leaderboards_dirty(source):
+    """Queues every live board that includes 'source' for a re-render."""
+    for target in live_leaderboard_targets_g:
+        if target.source is None or target.source.name == source.name:
+            live_leaderboard_dirty_g.add(target)
+
+
+async def get_live_leaderboard_data(target):
+    """
+    Builds the board from the poller's cached rows when every team on it has been indexed, so an update
+    costs no Sheets call. Falls back to a normal fetch otherwise. Returns None if the data isn't available.
+    """
+    parsed_rows = get_indexed_parsed_rows(target.source)
+    if parsed_rows is not None:
+        return await gsu.get_leaderboard_from_parsed_rows(parsed_rows, target.timeframe)
+    return await refresh_leaderboard_cache(target.timeframe, target.source)
+
+
+def leaderboard_fingerprint(content, embed) -> str:
+    """Hash of what a board shows, leaving out the 'Last updated' time so an unchanged board isn't edited."""
+    if embed is None:
+        shown = content
+    else:
+        shown = [embed.title, embed.description, embed.footer.text.split("\n")[0],
+                 [(field.name, field.value) for field in embed.fields]]
+    return hashlib.sha1(json.dumps(shown, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+async def render_live_leaderboard(target) -> bool:
+    """Edits (or first posts and pins) one live board. Returns False if it should be retried later."""
+    channel = get_configured_channel(target.channel_id)
+    if channel is None:
+        print(f"Error: Live leaderboard channel ID {target.channel_id} not found or bot cannot access it.")
+        return True
+
+    leaderboard_data = await get_live_leaderboard_data(target)
+    if leaderboard_data is None:
+        return False
+    embed = build_leaderboard_embed(leaderboard_data, target.timeframe, target.source) if leaderboard_data else None
+    content = None if embed else f"No sales recorded yet this {target.timeframe[:-2]}."
+    fingerprint = leaderboard_fingerprint(content, embed)
+
+    stored = live_leaderboard_store_g.get(target)
+    if stored is not None:
+        message_id, stored_fingerprint = stored
+        if stored_fingerprint == fingerprint:
+            return True
+        try:
+            await channel.get_partial_message(message_id).edit(content=content, embed=embed)
+            live_leaderboard_store_g.save(target, message_id, fingerprint)
+            return True
+        except discord.NotFound:
+            print(f"Live {target.board} leaderboard message in channel {target.channel_id} was deleted. Posting a new one.")
+            live_leaderboard_store_g.delete(target)
+
+    message = await channel.send(content=content, embed=embed)
+    try:
+        await message.pin()
+    except discord.HTTPException as e:
+        print(f"Couldn't pin the live {target.board} leaderboard in channel {target.channel_id}: {e}")
+    live_leaderboard_store_g.save(target, message.id, fingerprint)
+    print(f"Posted live {target.board} leaderboard in channel {target.channel_id}.")
+    return True
+
+
+# --- Task: Update live leaderboards ---
+@tasks.loop(seconds=5)
+async def update_live_leaderboards():
+    """Re-renders boards marked dirty by the poller, each at most once per LIVE_LEADERBOARD_MIN_INTERVAL seconds."""
+    now = asyncio.get_running_loop().time()
+    min_interval = settings.get().live_leaderboard_min_interval
+    for target in live_leaderboard_targets_g:
+        last_render = live_leaderboard_last_render_g.get(target)
+        if last_render is not None and now - last_render >= LIVE_LEADERBOARD_RECHECK_SECONDS:
+            live_leaderboard_dirty_g.add(target)
+        if target not in live_leaderboard_dirty_g or (last_render is not None and now - last_render < min_interval):
+            continue
+
+        # Cleared before rendering, so sales detected while this board renders mark it dirty again.
+        live_leaderboard_dirty_g.discard(target)
+        live_leaderboard_last_render_g[target] = now
+        try:
+            rendered = await render_live_leaderboard(target)
+        except discord.HTTPException as e:
+            print(f"Error updating live {target.board} leaderboard in channel {target.channel_id}: {e}")
+            rendered = False
+        except Exception as e:
+            print(f"Unexpected error updating live {target.board} leaderboard: {e}")
+            traceback.print_exc()
+            rendered = False
+        if not rendered:
+            live_leaderboard_dirty_g.add(target)
+
+
+# --- Health endpoint (data freshness and queue depths for the process supervisor) ---
+def build_health_report() -> dict:
+    """Ready means every team's sheet was polled successfully within HEALTH_MAX_POLL_AGE seconds."""
+    now = dt.now(ZoneInfo("America/New_York"))
+    max_poll_age = settings.get().health_max_poll_age
+
+    sources = {}
+    for source in sales_sources_g:
+        last_poll = last_successful_poll_g.get(source.name)
+        sources[source.name] = {
+            "initialized": source.name in sheet_indexes_g,
+            "last_successful_poll": last_poll.isoformat() if last_poll else None,
+            "seconds_since_poll": round((now - last_poll).total_seconds()) if last_poll else None,
+            "rows": last_known_row_count_g.get(source.name),
+        }
+    ready = bot.is_ready() and all(
+        info["seconds_since_poll"] is not None and info["seconds_since_poll"] <= max_poll_age for info in sources.values()
+    )
+
+    leaderboards = {}
+    for (source_name, timeframe), (computed_at, _, _) in leaderboard_cache_g.items():
+        error = leaderboard_refresh_errors_g.get((source_name, timeframe))
+        leaderboards[f"{timeframe}:{source_name or 'all teams'}"] = {
+            "computed_at": computed_at.isoformat(),
+            "age_seconds": round((now - computed_at).total_seconds()),
+            "last_error": f"{error[0].isoformat()} {error[1]}" if error else None,
+        }
+
+    report = {
+        "status": "ok" if ready else "degraded",
+        "ready": ready,
+        "time": now.isoformat(),
+        "sources": sources,
+        "leaderboards": leaderboards,
+        "notification_outbox": notification_outbox_g.counts(),
+        "live_leaderboards_pending": len(live_leaderboard_dirty_g),
+    }
+    if loop_watchdog_g:
+        loop_stats = loop_watchdog_g.snapshot()
+        # Stack traces are left to the log; the endpoint only reports how many recent stalls there were.
+        loop_stats["recent_stalls"] = len(loop_stats["recent_stalls"])
+        report["event_loop"] = loop_stats
+    return report
+
+
+def create_health_server_from_env():
+    """Builds the health server when HEALTH_PORT is set, otherwise returns None."""
+    if startup_settings.health_port is None:
+        return None
+    return HealthServer(build_health_report, startup_settings.health_host, startup_settings.health_port)
+
+
+health_server_g = create_health_server_from_env()
+
+
+# --- Configured channels (looked up once the guilds are cached, so a bad ID shows up at startup) ---
+configured_channels_g = {}
+
+
+def get_configured_channel_ids() -> dict:
+    """{channel_id: what it's used for} for every channel in the settings."""
+    channel_ids = {}
+    for source in sales_sources_g:
+        for channel_id, purpose in ((source.notification_channel_id, "notification"), (source.chat_channel_id, "chat"),
+                                    (source.leaderboard_channel_id, "leaderboard")):
+            if channel_id:
+                channel_ids.setdefault(channel_id, f"{source.name} {purpose}")
+    org_channel_id = settings.get().org_leaderboard_channel_id
+    if org_channel_id:
+        channel_ids.setdefault(org_channel_id, "org-wide leaderboard")
+    for target in live_leaderboard_targets_g:
+        channel_ids.setdefault(target.channel_id, f"live {target.board} leaderboard")
+    return channel_ids
+
+
+def resolve_configured_channels():
+    configured_channels_g.clear()
+    for channel_id, purpose in get_configured_channel_ids().items():
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            print(f"Error: The {purpose} channel ID {channel_id} was not found or the bot cannot access it.")
+        else:
+            configured_channels_g[channel_id] = channel
+    print(f"Resolved {len(configured_channels_g)} configured channels.")
+
+
+def get_configured_channel(channel_id):
+    """The channel resolved at startup, falling back to a cache lookup for channels added since."""
+    return configured_channels_g.get(channel_id) or bot.get_channel(channel_id)
+
+
+# --- Event: Setup Hook (runs once, before connecting to the gateway) ---
+@bot.event
+async def setup_hook():
+    install_reload_handler()
+    if loop_watchdog_g:
+        loop_watchdog_g.start()
+    if health_server_g:
+        try:
+            await health_server_g.start()
+        except OSError as e:
+            print(f"Error: Couldn't start the health endpoint on port {health_server_g.port}: {e}")
+
 # --- Event: Bot Ready ---
 @bot.event
 async def on_ready():
     print(f'{bot.user.name} has connected to Discord!')
     print(f"Bot ID: {bot.user.id}")
     bot.add_view(OnboardingView())
-    await initialize_row_count()
+    resolve_configured_channels()
+    # Start sending anything left in the outbox from the last run while the row counts initialize.
+    if not drain_notification_outbox.is_running():
+        drain_notification_outbox.start()
+    await asyncio.gather(*(initialize_row_count(source) for source in sales_sources_g))
     if not check_for_new_sales.is_running():
         check_for_new_sales.start()
-    if not automated_leaderboard_poster.is_running():
-        automated_leaderboard_poster.start()
+    job_scheduler_g.start()
+    if live_leaderboard_targets_g and not update_live_leaderboards.is_running():
+        update_live_leaderboards.start()
+    apply_memory_report_interval()
 
 # --- Task: Check for New Sales (Polling) ---
 @tasks.loop(seconds=60)
 async def check_for_new_sales():
-    global last_known_row_count_g, initial_check_done
+    """Polls every team's worksheet concurrently."""
+    await asyncio.gather(*(poll_source_for_new_sales(source) for source in sales_sources_g))
+
+
+def get_tracked_cells(row_values, column_indexes) -> list:
+    """A full row's timestamp, name and premium cells, as fetch_tracked_rows returns them."""
+    return [row_values[col] if col is not None and col < len(row_values) else ""
+            for col in (column_indexes["timestamp"], column_indexes["first_name"], column_indexes["premium"])]
+
+
+def get_sale_fields(row_values, column_indexes) -> dict:
+    """{column field: cell value}. 'N/A' when the sheet has no such column, None when the row is shorter than it."""
+    return {
+        name: "N/A" if col is None else (row_values[col] if col < len(row_values) else None)
+        for name, col in column_indexes.items()
+    }
 
-    custom_alarm_emoji = os.getenv("ALARM_EMOJI_TAG", "<a:AlarmreminderUrgence:1370133606856392816>")
-    custom_gsd_emoji = os.getenv("GSD_EMOJI_TAG", "<:GSD:1369689499592036364>")
 
-    if not initial_check_done:
-        print("Waiting for initial row count check to complete...")
+async def poll_source_for_new_sales(source):
+    """
+    Checks one team's worksheet for changes and queues a notification for each new sale.
+    Rows are compared by content hash, so edited or deleted rows update the cached data
+    instead of being mistaken for (or hiding) new sales.
+    """
+    config = settings.get()
+    custom_alarm_emoji = config.alarm_emoji
+    custom_gsd_emoji = config.gsd_emoji
+
+    if source.name not in sheet_indexes_g:
+        print(f"[{source.name}] Waiting for initial row count check to complete...")
         return
 
-    sheet = await gsu.get_sheet()
+    sheet = await gsu.get_sheet(source)
     if not sheet:
-        print("Sheet not available for polling new sales.")
+        print(f"[{source.name}] Sheet not available for polling new sales.")
         return
 
+    index = sheet_indexes_g[source.name]
+    # Set while the index holds changes that haven't been acted on yet. If the poll fails before they are,
+    # the index is put back so the next poll finds the same changes again instead of losing the new sales.
+    unhandled_index_state = None
     try:
-        all_values_from_sheet = await sheet.get_all_values()
-        current_total_rows = len(all_values_from_sheet)
-
-        if current_total_rows > last_known_row_count_g:
-            print(f"Change detected! Old rows: {last_known_row_count_g}, New rows: {current_total_rows}")
-            headers = all_values_from_sheet[0] if len(all_values_from_sheet) > 0 else []
-
-            leaderboard_data = await gsu.get_sales_leaderboard_data(sheet, 'weekly')
-            
-            notification_channel_id_str = os.getenv("NOTIFICATION_CHANNEL_ID")
-            chat_channel_id_str = os.getenv("CHAT_CHANNEL_ID")
-            first_name_column = os.getenv("FIRST_NAME_COLUMN", "Name")
-            sale_type_column = os.getenv("SALE_TYPE_COLUMN", "Sale Type")
-            premium_column = os.getenv("PREMIUM_COLUMN", "Premium")
-            appointments_left_column = os.getenv("APPOINTMENTS_LEFT_COLUMN", "Appointments Left")
-            carrier_column = os.getenv("CARRIER_COLUMN", "Carrier")
-            lead_age_column = os.getenv("LEAD_AGE_COLUMN", "Lead Age")
-            lead_type_column = os.getenv("LEAD_TYPE_COLUMN", "Lead Type")
-            field_or_telesale_column = os.getenv("FIELD_OR_TELESALE_COLUMN", "Field or Telesale")
-            draft_date_column = os.getenv("DRAFT_DATE_COLUMN", "Draft Date")
-            face_value_column = os.getenv("FACE_VALUE_COLUMN", "Face Value")
-
-            if not notification_channel_id_str:
-                print("Error: NOTIFICATION_CHANNEL_ID is not set in .env")
-                last_known_row_count_g = current_total_rows
+        tracked_rows = await fetch_tracked_rows(sheet)
+        if tracked_rows is None:
+            print(f"[{source.name}] Couldn't fetch the tracked columns {get_tracked_columns()}.")
+            return
+        current_total_rows = len(tracked_rows)
+
+        # Hashing and diffing a big sheet runs in a worker thread. It is shielded because the index is
+        # mutated in place and must not be abandoned halfway through an update.
+        index_state = index.snapshot()
+        diff = await asyncio.shield(gsu.run_offloaded(index.update, tracked_rows, rows=len(tracked_rows)))
+        unhandled_index_state = index_state
+        last_successful_poll_g[source.name] = dt.now(ZoneInfo("America/New_York"))
+
+        if diff.new_rows:
+            # Only the new rows are downloaded in full, for the notification text. This happens before the
+            # change is acted on, so a failed fetch leaves nothing half done.
+            headers = await gsu.get_header_row(sheet)
+            new_full_rows = await gsu.get_rows(sheet, [i + 1 for i in diff.new_rows])
+            # Column positions are looked up once per header row and cached.
+            column_indexes = config.columns.indexes(headers)
+            moved = [i + 1 for i in diff.new_rows if get_tracked_cells(new_full_rows.get(i + 1, []), column_indexes) != tracked_rows[i]]
+            if moved:
+                # A row was added, removed or edited between the two reads, so these rows may not be the sales that were diffed.
+                print(f"[{source.name}] Rows {moved} changed while they were being read. Retrying on the next poll.")
                 return
 
-            try:
-                notification_channel_id = int(notification_channel_id_str)
-                chat_channel_id = int(chat_channel_id_str)
-            except ValueError:
-                print(f"Error: NOTIFICATION_CHANNEL_ID '{notification_channel_id_str}' is not a valid integer.")
-                last_known_row_count_g = current_total_rows
-                return
+        if diff.has_changes:
+            print(f"[{source.name}] Change detected! {diff.summary()}. Rows now: {current_total_rows}")
+            refresh_cached_leaderboards_for(source)
+            mark_live_leaderboards_dirty(source)
+
+        if diff.new_rows:
+            # The index already holds every parsed row, so the week-to-date totals need no second fetch.
+            leaderboard_data = await gsu.get_leaderboard_from_parsed_rows(index.parsed_rows, 'weekly')
 
-            notification_channel = bot.get_channel(notification_channel_id)
-            chat_channel = bot.get_channel(chat_channel_id)
-            if not notification_channel:
-                print(f"Error: Notification channel ID {notification_channel_id} not found.")
-                last_known_row_count_g = current_total_rows
+            if not source.notification_channel_id:
+                print(f"[{source.name}] Error: No valid notification channel ID is configured.")
+                advance_row_count(source, index)
+                unhandled_index_state = None
                 return
 
-            for i in range(last_known_row_count_g, current_total_rows):
-                if i < len(all_values_from_sheet):
-                    row_values = all_values_from_sheet[i]
-                    sale_data = {header: row_values[col_idx] if col_idx < len(row_values) else None for col_idx, header in enumerate(headers)}
-
-                    first_name = sale_data.get(first_name_column, "N/A")
-                    sale_type = sale_data.get(sale_type_column, "N/A")
-                    premium = sale_data.get(premium_column, "N/A")
-                    appointments_left = sale_data.get(appointments_left_column, "N/A")
-                    carrier = sale_data.get(carrier_column, "N/A")
-                    lead_age = sale_data.get(lead_age_column, "N/A")
-                    lead_type = sale_data.get(lead_type_column, "N/A")
-                    field_or_telesale = sale_data.get(field_or_telesale_column, "N/A")
-                    draft_date = sale_data.get(draft_date_column, "N/A")
-                    face_value = sale_data.get(face_value_column, "N/A")
-
-                    wtd_premium = leaderboard_data.get(first_name, {}).get("premium", 0.0)
-                    wtd_apps = leaderboard_data.get(first_name, {}).get("apps", 0)
+            channel_ids = [source.notification_channel_id]
+            if source.chat_channel_id:
+                channel_ids.append(source.chat_channel_id)
+
+            outbox_items = []
+            for i in diff.new_rows:
+                if i + 1 in new_full_rows:
+                    row_values = new_full_rows[i + 1]
+                    sale_data = get_sale_fields(row_values, column_indexes)
+
+                    first_name = sale_data["first_name"]
+                    sale_type = sale_data["sale_type"]
+                    premium = sale_data["premium"]
+                    appointments_left = sale_data["appointments_left"]
+                    carrier = sale_data["carrier"]
+                    lead_age = sale_data["lead_age"]
+                    lead_type = sale_data["lead_type"]
+                    field_or_telesale = sale_data["field_or_telesale"]
+                    draft_date = sale_data["draft_date"]
+                    face_value = sale_data["face_value"]
+
+                    # The leaderboard is keyed by canonical name, so "john " still finds John's totals.
+                    wtd_totals = leaderboard_data.get(gsu.salespeople.canonical_name(first_name), {})
+                    wtd_premium = wtd_totals.get("premium", 0.0)
+                    wtd_apps = wtd_totals.get("apps", 0)
 
                     if first_name != "N/A":
                         field_or_telesale_line = f"**Field/Telesale:** {field_or_telesale}\n" if field_or_telesale and field_or_telesale != "N/A" else ""
@@ -475,7 +957,7 @@ async def check_for_new_sales():
                         face_value_line = f"**Face Amount:** ${face_value}\n" if face_value and face_value != "N/A" else ""
                         apps_text = "App" if wtd_apps == 1 else "Apps"
 
-                        if is_first_sale(first_name, all_values_from_sheet, headers, first_name_column, i):
+                        if i in diff.first_sales:
                             message = (f"🎉🎉{custom_alarm_emoji} **First Sale Alert!** {custom_alarm_emoji}🎉🎉\n\n"
                                        f"Congratulations to **{first_name}** on making their very first sale!\n"
                                        f"**Sale Type:** {sale_type}\n"
@@ -503,24 +985,101 @@ async def check_for_new_sales():
                                        f"**Appointments Left ➔** {appointments_left}\n"
                                        f"**Week to Date Sales:** ${wtd_premium:,.2f} | {wtd_apps} {apps_text}\n\n"
                                        f"{custom_gsd_emoji}")
-                        
-                        await notification_channel.send(message)
-                        await chat_channel.send(message)
+
+                        row_key = make_row_key(i + 1, row_values)
+                        outbox_items.extend((row_key, channel_id, message) for channel_id in channel_ids)
                     else:
-                        print(f"Skipping notification for incomplete sale data: {sale_data}")
+                        print(f"[{source.name}] Skipping notification for incomplete sale data: {sale_data}")
 
-            last_known_row_count_g = current_total_rows
+            queued = notification_outbox_g.enqueue(source.name, outbox_items, current_total_rows, index.fingerprints)
+            unhandled_index_state = None
+            last_known_row_count_g[source.name] = current_total_rows
+            print(f"[{source.name}] Queued {queued} sale notifications.")
+        else:
+            unhandled_index_state = None
+            if diff.has_changes:
+                advance_row_count(source, index)
 
     except gspread.exceptions.APIError as e:
-        print(f"Google Sheets API error during polling: {e}")
+        print(f"[{source.name}] Google Sheets API error during polling: {e}")
         if hasattr(e, 'response') and e.response.status_code == 429:
             print("Rate limit hit. Pausing polling for a bit.")
             check_for_new_sales.change_interval(seconds=300)
             await asyncio.sleep(10)
             check_for_new_sales.change_interval(seconds=60)
     except Exception as e:
-        print(f"An error occurred in check_for_new_sales: {e}")
+        print(f"[{source.name}] An error occurred in check_for_new_sales: {e}")
         traceback.print_exc()
+    finally:
+        if unhandled_index_state is not None:
+            index.restore(unhandled_index_state)
+
+# --- Task: Send queued sale notifications ---
+@tasks.loop(seconds=2)
+async def drain_notification_outbox():
+    """Sends due outbox items. Runs separately from polling so slow Discord sends never delay the next poll."""
+    items = notification_outbox_g.claim_due(limit=10)
+    while items:
+        item = items.pop(0)
+        channel = get_configured_channel(item.channel_id)
+        if channel is None:
+            notification_outbox_g.mark_retry(item.id, f"Channel {item.channel_id} not found")
+            continue
+
+        try:
+            await channel.send(item.content)
+        except discord.RateLimited as e:
+            print(f"Rate limited sending notifications. Pausing the outbox for {e.retry_after:.1f}s.")
+            for pending in [item] + items:
+                notification_outbox_g.release(pending.id, e.retry_after)
+            return
+        except (discord.Forbidden, discord.NotFound) as e:
+            print(f"Error: Can't send queued notification {item.id} to channel {item.channel_id}: {e}")
+            configured_channels_g.pop(item.channel_id, None)
+            notification_outbox_g.mark_failed(item.id, e)
+        except discord.HTTPException as e:
+            retry_after = None
+            if e.status == 429:
+                retry_after = float(e.response.headers.get("Retry-After", 5))
+            print(f"Error sending queued notification {item.id} (attempt {item.attempts + 1}): {e}")
+            notification_outbox_g.mark_retry(item.id, e, retry_after)
+        except Exception as e:
+            print(f"Unexpected error sending queued notification {item.id}: {e}")
+            traceback.print_exc()
+            notification_outbox_g.mark_retry(item.id, e)
+        else:
+            notification_outbox_g.mark_sent(item.id)
+
+
+async def was_notification_already_sent(item) -> bool:
+    """Looks for the bot's own message with the same content posted after the item was queued."""
+    channel = get_configured_channel(item.channel_id)
+    if channel is None:
+        return False
+    queued_at = dt.fromtimestamp(item.created_at - 5, tz=ZoneInfo("UTC"))
+    async for message in channel.history(limit=50, after=queued_at):
+        if message.author == bot.user and message.content == item.content:
+            return True
+    return False
+
+
+@drain_notification_outbox.before_loop
+async def before_drain_notification_outbox():
+    await bot.wait_until_ready()
+    # Items still marked 'sending' were interrupted mid-send by the last shutdown. Only resend the ones
+    # that never made it to Discord.
+    for item in notification_outbox_g.in_flight():
+        try:
+            already_sent = await was_notification_already_sent(item)
+        except discord.HTTPException as e:
+            print(f"Couldn't check channel {item.channel_id} history for notification {item.id}: {e}")
+            already_sent = False
+        if already_sent:
+            notification_outbox_g.mark_sent(item.id)
+        else:
+            notification_outbox_g.release(item.id)
+    notification_outbox_g.prune_sent()
+    print(f"Notification outbox ready: {notification_outbox_g.counts()}")
 
 # --- Command: Weekly Leaderboard ---
 @bot.command(name='leaderboard', help='Displays the weekly sales leaderboard.')
@@ -534,9 +1093,98 @@ async def test_onboarding(ctx):
     view = OnboardingView()
     await ctx.send("Here is a fresh onboarding button to test: ", view=view)
 
+# --- Command: Export sales history ---
+@bot.command(name='export', help='Exports sales history as files. Options: csv or parquet, since=YYYY-MM-DD, '
+                                 'until=YYYY-MM-DD, name=<salesperson> (repeatable), period=day|week|month, team=<team>.')
+@commands.has_permissions(manage_guild=True)
+async def export_command(ctx, *options):
+    fmt, period, team_name = "csv", "week", None
+    filters = ExportFilters()
+    try:
+        for option in options:
+            key, _, value = option.partition("=")
+            key = key.strip().lower()
+            if not value and key in ("csv", "parquet"):
+                fmt = key
+            elif key in ("since", "until"):
+                setattr(filters, key, dt.strptime(value.strip(), "%Y-%m-%d").date())
+            elif key == "name":
+                # Looked up rather than resolved, so a typo doesn't become a salesperson for the rest of the run.
+                person_id = gsu.salespeople.lookup(value)
+                if person_id is None:
+                    raise ValueError(f"No salesperson called '{value.strip()}'" if value.strip() else "name= needs a salesperson")
+                if filters.salesperson_ids is None:
+                    filters.salesperson_ids = set()
+                filters.salesperson_ids.add(person_id)
+            elif key == "period" and value.strip().lower() in EXPORT_PERIODS:
+                period = value.strip().lower()
+            elif key == "team":
+                team_name = value.strip()
+            else:
+                raise ValueError(f"Unknown option '{option}'")
+    except ValueError as e:
+        await ctx.send(f"{e}. Usage: `!export [csv|parquet] [since=YYYY-MM-DD] [until=YYYY-MM-DD] [name=...] [period=day|week|month] [team=...]`")
+        return
+
+    if fmt == "parquet" and not parquet_available():
+        await ctx.send("Parquet export isn't available on this bot (pyarrow isn't installed). Try `!export csv`.")
+        return
+    sources = [source for source in sales_sources_g if team_name is None or source.name == team_name]
+    if not sources:
+        await ctx.send(f"There's no team called '{team_name}'.")
+        return
+
+    await ctx.send(f"Exporting sales history as {fmt}... 📦", delete_after=15)
+    upload_limit = ctx.guild.filesize_limit if ctx.guild else 10 * 1024 * 1024
+    for source in sources:
+        sheet = await gsu.get_sheet(source)
+        if not sheet:
+            await ctx.send(f"Sorry, I couldn't open {source.name}'s sales sheet right now. Please try again later.")
+            continue
+        prefix = "".join(c if c.isalnum() else "_" for c in source.name.lower())
+        try:
+            with tempfile.TemporaryDirectory(prefix="winbot_export_") as out_dir:
+                result = await export_sales(sheet, out_dir, fmt, filters, period, file_prefix=prefix)
+                too_big = [os.path.basename(path) for path in result.files if os.path.getsize(path) > upload_limit]
+                if too_big:
+                    await ctx.send(f"{source.name}: {', '.join(too_big)} is over Discord's upload limit. Narrow it down with since=, until= or name=.")
+                    continue
+                await ctx.send(
+                    f"{source.name}: {result.rows_written:,} of {result.rows_scanned:,} rows, with {EXPORT_PERIODS[period]} totals per salesperson.",
+                    files=[discord.File(path) for path in result.files]
+                )
+        except gspread.exceptions.APIError as e:
+            print(f"[{source.name}] Google Sheets API error during export: {e}")
+            await ctx.send(f"There was an API error reading {source.name}'s sheet. Please try again later.")
+        except Exception as e:
+            print(f"[{source.name}] Error during export: {e}")
+            traceback.print_exc()
+            await ctx.send(f"An unexpected error occurred while exporting {source.name}'s sales.")
+
+
+# --- Memory report (resident size and cache sizes) ---
+def get_memory_report() -> dict:
+    return build_memory_report(bot, {
+        "sheet_index_rows": sum(index.row_count for index in sheet_indexes_g.values()),
+        "cached_leaderboards": len(leaderboard_cache_g),
+    })
+
+
+@bot.command(name='memory', help='Shows the bot\'s memory use and cache sizes.')
+@commands.has_permissions(manage_guild=True)
+async def memory_command(ctx):
+    await ctx.send(f"```\n{format_memory_report(get_memory_report())}\n```")
+
+
+@tasks.loop(minutes=60)
+async def log_memory_report():
+    report = get_memory_report()
+    print("MEMORY: " + ", ".join(f"{key}={value}" for key, value in report.items()))
+
+
 # --- Helper: Get Gemini Response ---
 async def get_gemini_response(prompt):
-    if not GEMINI_API_KEY:
+    if not settings.get().gemini_api_key:
         return "The AI feature is not configured. Please contact Angelo N."
     try:
         model = genai.GenerativeModel('gemini-1.5-flash')
@@ -644,77 +1292,163 @@ async def on_message(message):
 
     await bot.process_commands(message)
 
-# --- Task: Automated Weekly Leaderboard Post ---
-@tasks.loop(time=time(19, 0, tzinfo=ZoneInfo("America/New_York")))
-async def automated_leaderboard_poster():
-    automated_leaderboard_channel_id_str = os.getenv("AUTOMATED_LEADERBOARD_CHANNEL_ID")
-    if not automated_leaderboard_channel_id_str:
-        print("Error: AUTOMATED_LEADERBOARD_CHANNEL_ID is not set in .env. Automated leaderboard will not be posted.")
-        return
-    
-    try:
-        automated_leaderboard_channel_id = int(automated_leaderboard_channel_id_str)
-    except ValueError:
-        print(f"Error: AUTOMATED_LEADERBOARD_CHANNEL_ID '{automated_leaderboard_channel_id_str}' is not a valid integer.")
+# --- Scheduled jobs ---
+# Every timed post runs from one scheduler. Schedules come from .env ("[days] HH:MM" in Eastern time, or "off"),
+# and each job's leaderboards are fetched SCHEDULE_PREWARM_LEAD_MINUTES ahead so the post itself needs no Sheets call.
+eastern_tz_g = ZoneInfo("America/New_York")
+job_scheduler_g = JobScheduler(eastern_tz_g)
+
+
+def get_prewarmed_max_age() -> timedelta:
+    """How old a pre-warmed board may be when a scheduled post uses it: the lead time plus some slack."""
+    return settings.get().schedule_prewarm_lead + timedelta(minutes=5)
+
+
+def get_automated_leaderboard_targets() -> list:
+    """(channel_id, source) pairs for the automated weekly post; source None is the org-wide board."""
+    if len(sales_sources_g) == 1:
+        source = sales_sources_g[0]
+        if not source.leaderboard_channel_id:
+            print("Error: AUTOMATED_LEADERBOARD_CHANNEL_ID is not set in .env. Automated leaderboard will not be posted.")
+            return []
+        return [(source.leaderboard_channel_id, source)]
+
+    # Several teams: each team board goes to its own channel, the org-wide board to AUTOMATED_LEADERBOARD_CHANNEL_ID.
+    targets = [(source.leaderboard_channel_id, source) for source in sales_sources_g if source.leaderboard_channel_id]
+    org_channel_id = settings.get().org_leaderboard_channel_id
+    if org_channel_id:
+        targets.append((org_channel_id, None))
+    return targets
+
+
+def register_scheduled_job(name: str, schedule: str, callback, prewarm=None):
+    """Registers (or replaces) a job. 'schedule' has already been validated by the settings."""
+    if schedule == "off":
+        job_scheduler_g.unregister(name)
+        print(f"Scheduled job '{name}' is turned off.")
         return
+    run_at, weekdays = parse_schedule(schedule)
+    job_scheduler_g.register(ScheduledJob(
+        name=name, run_at=run_at, weekdays=weekdays, callback=callback,
+        prewarm=prewarm, prewarm_lead=settings.get().schedule_prewarm_lead
+    ))
+
+
+def register_scheduled_jobs():
+    config = settings.get()
+    register_scheduled_job("automated leaderboard", config.schedule_leaderboard_post,
+                           automated_leaderboard_poster, prewarm_automated_leaderboard)
+    register_scheduled_job("Tuesday motivation GIF", config.schedule_tuesday_gif,
+                           post_tuesday_motivation_gif, prewarm_tuesday_motivation_gif)
 
-    channel = bot.get_channel(automated_leaderboard_channel_id)
+
+# --- Job: Automated Weekly Leaderboard Post ---
+async def prewarm_automated_leaderboard():
+    await asyncio.gather(*(refresh_leaderboard_cache('weekly', source) for _, source in get_automated_leaderboard_targets()))
+
+
+async def automated_leaderboard_poster():
+    await asyncio.gather(*(post_automated_leaderboard(channel_id, source) for channel_id, source in get_automated_leaderboard_targets()))
+
+
+async def post_automated_leaderboard(channel_id: int, source):
+    """Posts the weekly board for 'source' (or the org-wide board when None) to the given channel."""
+    channel = get_configured_channel(channel_id)
     if channel:
         print(f"Posting automated leaderboard to channel: {channel.name} ({channel.id})")
-        await generate_and_post_leaderboard(channel, 'weekly')
+        await generate_and_post_leaderboard(channel, 'weekly', source, max_cache_age=get_prewarmed_max_age())
     else:
-        print(f"Error: Automated leaderboard channel ID {automated_leaderboard_channel_id} not found or bot cannot access it.")
+        print(f"Error: Automated leaderboard channel ID {channel_id} not found or bot cannot access it.")
+
+
+# --- Job: Tuesday Motivation GIF ---
+async def prewarm_tuesday_motivation_gif():
+    await asyncio.gather(*(refresh_leaderboard_cache('weekly', source) for source in sales_sources_g))
 
 
-@tasks.loop(time=time(13,30, tzinfo=ZoneInfo("America/New_York")))
 async def post_tuesday_motivation_gif():
-    if dt.now(tz=ZoneInfo("America/New_York")).weekday() != 1:
-        return
-    
-    sheet = await gsu.get_sheet()
-    if not sheet:
-        print("Sheet not available for Tuesday GIF check.")
+    await asyncio.gather(*(post_tuesday_motivation_gif_for_source(source) for source in sales_sources_g))
 
-    leaderboard_data = await gsu.get_sales_leaderboard_data(sheet, 'weekly')
+
+async def post_tuesday_motivation_gif_for_source(source):
+    """Posts the motivation GIF to a team's notification channel if the team has no sales yet this week."""
+    leaderboard_data, _ = await get_leaderboard_stale_while_revalidate('weekly', source, get_prewarmed_max_age())
+    if leaderboard_data is None:
+        print(f"[{source.name}] Sales data not available for Tuesday GIF check.")
+        return
 
     if not leaderboard_data:
-        gif_url = os.getenv("TUESDAY_NOON_GIF_URL")
-        channel_id_str = os.getenv("NOTIFICATION_CHANNEL_ID")
+        gif_url = settings.get().tuesday_gif_url
 
-        if not gif_url or not channel_id_str:
-            print("Error: TUESDAY_NOON_GIF_URL or NOTIFICATION_CHANNEL_ID is not set in .env")
+        if not gif_url or not source.notification_channel_id:
+            print(f"[{source.name}] Error: TUESDAY_NOON_GIF_URL or the notification channel ID is not set")
             return
-        
-        try:
-            channel_id = int(channel_id_str)
-        except ValueError:
-            print(f"Error: NOTIFICATION_CHANNEL_ID '{channel_id_str}' is not a valid integer.")
-            return
-        
-        channel = bot.get_channel(channel_id)
+
+        channel = get_configured_channel(source.notification_channel_id)
         if channel:
-            print("No sales by Tuesday noon, posting motivation GIF.")
+            print(f"[{source.name}] No sales by Tuesday noon, posting motivation GIF.")
             await channel.send(gif_url)
         else:
-            print(f"Error: Notification channel ID {channel_id} not found or bot cannot access it.")
+            print(f"[{source.name}] Error: Notification channel ID {source.notification_channel_id} not found or bot cannot access it.")
 
-@post_tuesday_motivation_gif.before_loop
-async def before_post_tuesday_motivation_gif():
-    print('Waiting for bot to be ready before posting Tuesday motivation GIF...')
-    await bot.wait_until_ready()
-    print('Bot is ready, starting Tuesday motivation GIF poster.')
 
+register_scheduled_jobs()
 
-@automated_leaderboard_poster.before_loop
-async def before_automated_leaderboard_poster():
-    print('Waiting for bot to be ready before starting automated leaderboard poster...')
-    await bot.wait_until_ready()
-    print('Bot is ready, starting automated leaderboard poster.')
+
+# --- Settings reload (SIGHUP) ---
+def apply_memory_report_interval():
+    interval = settings.get().memory_report_interval_minutes
+    if interval <= 0:
+        if log_memory_report.is_running():
+            log_memory_report.cancel()
+        return
+    log_memory_report.change_interval(minutes=interval)
+    if not log_memory_report.is_running():
+        log_memory_report.start()
+
+
+def apply_live_leaderboard_targets():
+    global live_leaderboard_targets_g
+    targets = parse_live_leaderboard_targets(settings.get().live_leaderboards, sales_sources_g)
+    if targets == live_leaderboard_targets_g:
+        return
+    live_leaderboard_targets_g = targets
+    live_leaderboard_dirty_g.intersection_update(targets)
+    # New boards get rendered on the next tick; removed boards' messages are left in place.
+    live_leaderboard_dirty_g.update(target for target in targets if target not in live_leaderboard_last_render_g)
+    if targets and not update_live_leaderboards.is_running():
+        update_live_leaderboards.start()
+    print(f"Live leaderboards: {len(targets)} configured.")
+
+
+def reload_settings():
+    """Re-reads .env and applies what can change while running. The rest is kept until the next restart."""
+    print("Reloading settings from .env...")
+    old, new, pending = settings.reload()
+    if new.gemini_api_key and new.gemini_api_key != old.gemini_api_key:
+        genai.configure(api_key=new.gemini_api_key)
+    register_scheduled_jobs()
+    if bot.is_ready():
+        job_scheduler_g.start()
+        apply_memory_report_interval()
+        apply_live_leaderboard_targets()
+        resolve_configured_channels()
+    for name in pending:
+        print(f"Setting '{name}' changed but only takes effect after a restart.")
+    print("Settings reloaded.")
+
+
+def install_reload_handler():
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on Windows; settings can only change with a restart there.
+        print("Settings reload on SIGHUP isn't available on this platform.")
 
 
 if __name__ == "__main__":
-    discord_bot_token = os.getenv("DISCORD_BOT_TOKEN")
-    google_service_account_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
+    discord_bot_token = startup_settings.discord_bot_token
+    google_service_account_file = startup_settings.google_service_account_file
 
     if not discord_bot_token:
         print("Error: DISCORD_BOT_TOKEN is not set in .env")
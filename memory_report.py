@@ -0,0 +1,48 @@
+import resource
+
+
+def read_process_memory():
+    """
+    Returns {'rss_kb': ..., 'peak_rss_kb': ...} for this process.
+    Reads VmRSS/VmHWM from /proc/self/status; where that doesn't exist only the peak is known (from getrusage).
+    """
+    memory = {"rss_kb": None, "peak_rss_kb": None}
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    memory["peak_rss_kb"] = int(line.split()[1])
+    except (OSError, ValueError):
+        memory["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+def build_memory_report(bot, extra_counts=None):
+    """Resident memory plus the size of discord.py's caches and any of the bot's own caches passed in extra_counts."""
+    report = read_process_memory()
+    report.update({
+        "guilds": len(bot.guilds),
+        "cached_members": sum(len(guild.members) for guild in bot.guilds),
+        "guild_member_total": sum(guild.member_count or 0 for guild in bot.guilds),
+        "cached_users": len(bot.users),
+        "channels": sum(len(guild.channels) for guild in bot.guilds),
+        "cached_messages": len(bot.cached_messages),
+    })
+    report.update(extra_counts or {})
+    return report
+
+
+_MEMORY_LABELS = {"rss_kb": "Resident memory (RSS)", "peak_rss_kb": "Peak RSS"}
+
+
+def format_memory_report(report):
+    """One line per figure, memory in MB."""
+    lines = []
+    for key, value in report.items():
+        if key in _MEMORY_LABELS:
+            lines.append(f"{_MEMORY_LABELS[key]}: {'n/a' if value is None else f'{value / 1024:.1f} MB'}")
+        else:
+            lines.append(f"{key.replace('_', ' ').capitalize()}: {value:,}")
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+
+
+# Retries back off 5s, 10s, 20s ... up to 10 minutes; after MAX_ATTEMPTS the item is parked as 'failed'.
+MAX_ATTEMPTS = 8
+BASE_RETRY_DELAY = 5
+MAX_RETRY_DELAY = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT,
+    UNIQUE (source, row_key, channel_id)
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS poll_cursor (
+    source TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS row_fingerprints (
+    source TEXT PRIMARY KEY,
+    fingerprints BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def make_row_key(row_number, row_values):
+    """
+    Identity of a sheet row for deduplication: its 1-based row number plus a hash of its contents,
+    so a different sale later landing on a reused row number is still treated as new.
+    """
+    digest = hashlib.sha1(json.dumps(row_values, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    return f"{row_number}:{digest}"
+
+
+@dataclass
+class OutboxItem:
+    id: int
+    source: str
+    row_key: str
+    channel_id: int
+    content: str
+    attempts: int
+    created_at: float
+
+
+class NotificationOutbox:
+    """
+    Durable queue of sale notifications, stored in SQLite next to the bot.
+    The poller enqueues messages and advances its row cursor in the same transaction, and a separate
+    worker sends them. Items go pending -> sending -> sent, so after a crash the worker can tell
+    which messages might already be in Discord and check before sending them again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get_cursor(self, source_name):
+        """Returns the persisted row count for a source, or None if it has never been polled."""
+        row = self._conn.execute("SELECT row_count FROM poll_cursor WHERE source = ?", (source_name,)).fetchone()
+        return row["row_count"] if row else None
+
+    def get_fingerprints(self, source_name):
+        """Returns the row fingerprints saved with the source's cursor (see SalesSheetIndex.fingerprints), or None."""
+        row = self._conn.execute("SELECT fingerprints FROM row_fingerprints WHERE source = ?", (source_name,)).fetchone()
+        return bytes(row["fingerprints"]) if row else None
+
+    def set_cursor(self, source_name, row_count, fingerprints=None):
+        with self._conn:
+            self._set_cursor(source_name, row_count, fingerprints)
+
+    def _set_cursor(self, source_name, row_count, fingerprints=None):
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO poll_cursor (source, row_count, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(source) DO UPDATE SET row_count = excluded.row_count, updated_at = excluded.updated_at",
+            (source_name, row_count, now)
+        )
+        if fingerprints is not None:
+            self._conn.execute(
+                "INSERT INTO row_fingerprints (source, fingerprints, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET fingerprints = excluded.fingerprints, updated_at = excluded.updated_at",
+                (source_name, fingerprints, now)
+            )
+
+    def enqueue(self, source_name, items, new_row_count=None, fingerprints=None):
+        """
+        Adds (row_key, channel_id, content) items and, if given, moves the source's cursor to new_row_count
+        (and saves its row fingerprints), all in one transaction. Items already in the outbox are ignored,
+        so re-detecting a row never queues a second notification. Returns the number of newly queued items.
+        """
+        now = time.time()
+        with self._conn:
+            added = 0
+            for row_key, channel_id, content in items:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (source, row_key, channel_id, content, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (source_name, row_key, channel_id, content, now, now)
+                )
+                added += cursor.rowcount
+            if new_row_count is not None:
+                self._set_cursor(source_name, new_row_count, fingerprints)
+        return added
+
+    def claim_due(self, limit=10):
+        """Marks up to `limit` due items as 'sending' and returns them, oldest first."""
+        now = time.time()
+        with self._conn:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            self._conn.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", [(row["id"],) for row in rows])
+        return [self._to_item(row) for row in rows]
+
+    def in_flight(self):
+        """Items left in 'sending' by a previous run that stopped before recording the result."""
+        rows = self._conn.execute("SELECT * FROM outbox WHERE status = 'sending' ORDER BY id").fetchall()
+        return [self._to_item(row) for row in rows]
+
+    def mark_sent(self, item_id):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                (time.time(), item_id)
+            )
+
+    def mark_failed(self, item_id, error):
+        """Parks an item permanently, e.g. when the channel is gone or the bot lacks permission."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (str(error)[:500], item_id)
+            )
+
+    def release(self, item_id, delay=0):
+        """Returns an item to 'pending' without counting an attempt (used when pausing for a rate limit)."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', next_attempt_at = ? WHERE id = ?",
+                (time.time() + delay, item_id)
+            )
+
+    def mark_retry(self, item_id, error, retry_after=None):
+        """Schedules another attempt with exponential backoff, or parks the item after MAX_ATTEMPTS."""
+        row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return
+        attempts = row["attempts"] + 1
+        if attempts >= MAX_ATTEMPTS:
+            status, delay = "failed", 0
+        else:
+            status = "pending"
+            delay = retry_after if retry_after is not None else min(BASE_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        with self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, str(error)[:500], item_id)
+            )
+
+    def counts(self):
+        """Returns {'pending': n, 'sending': n, 'sent': n, 'failed': n}."""
+        counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def prune_sent(self, older_than_seconds=30 * 86400):
+        """Deletes sent items older than the cutoff so the file doesn't grow forever."""
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+                (time.time() - older_than_seconds,)
+            )
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _to_item(row):
+        return OutboxItem(
+            id=row["id"], source=row["source"], row_key=row["row_key"], channel_id=row["channel_id"],
+            content=row["content"], attempts=row["attempts"], created_at=row["created_at"]
+        )
@@ -0,0 +1,365 @@
+"""
+Offline replay harness for the sale notification path.
+
+Feeds a stream of row appends into an in-memory stand-in worksheet and runs the bot's real
+poller (poll_source_for_new_sales) and outbox sender (drain_notification_outbox) against it,
+with a fake Discord channel layer. Time is simulated: polls, outbox drains and appends are
+replayed in order on a virtual clock, each Sheets or Discord call costs a configurable latency,
+and the real CPU time the bot spends is added on top. For every scenario it reports the
+append-to-post latency percentiles and the API calls made per sale.
+
+The poller and the sender take turns rather than overlapping as they do in the live bot, which
+is close enough for comparing polling strategies.
+
+Examples:
+    python replay_harness.py --poll-intervals 15,30,60 --burst-sizes 1,5,20
+    python replay_harness.py --replay recorded_appends.csv --poll-intervals 60
+
+A recorded stream is a CSV whose header row is "offset_seconds" followed by the sheet's column
+names; each line is one appended row and how many seconds after the start it was added.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# main opens its state DB at import time, so point it at a directory that is removed when the harness exits
+# (never at the bot's real state file).
+_state_dir = tempfile.TemporaryDirectory(prefix="winbot_replay_")
+os.environ["STATE_DB_PATH"] = os.path.join(_state_dir.name, "state.db")
+
+import main  # noqa: E402
+from notification_outbox import NotificationOutbox  # noqa: E402
+from sales_sources import SalesSource  # noqa: E402
+
+# Scenarios swap in their own outbox, so keep the one main opened to close it at exit.
+_import_time_outbox = main.notification_outbox_g
+
+
+DRAIN_INTERVAL = 2
+NOTIFICATION_CHANNEL_ID = 1001
+CHAT_CHANNEL_ID = 1002
+SYNTHETIC_HEADERS = ["Date", "Name", "Sale Type", "Premium", "Carrier", "Lead Type", "Lead Age", "Appointments Left"]
+SYNTHETIC_NAMES = ["Alex", "Blake", "Casey", "Drew", "Emery", "Finley", "Harper", "Jordan", "Kendall", "Logan",
+                   "Morgan", "Parker", "Quinn", "Riley", "Rowan", "Sawyer", "Taylor", "Avery", "Reese", "Skyler"]
+
+
+class VirtualClock:
+    """Simulated time in seconds. Inside a step it runs on from the step's start with real elapsed time plus simulated latency."""
+
+    def __init__(self):
+        self.base = 0.0
+        self._step_real_start = None
+        self._step_latency = 0.0
+
+    def now(self):
+        if self._step_real_start is None:
+            return self.base
+        return self.base + (time.perf_counter() - self._step_real_start) + self._step_latency
+
+    def begin_step(self, at):
+        self.base = max(self.base, at)
+        self._step_real_start = time.perf_counter()
+        self._step_latency = 0.0
+
+    def end_step(self):
+        self.base = self.now()
+        self._step_real_start = None
+
+    def spend(self, seconds):
+        """Simulated latency of an API call."""
+        if self._step_real_start is None:
+            self.base += seconds
+        else:
+            self._step_latency += seconds
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _parse_a1(ref):
+    """'B12' -> (12, 2), 'B' -> (None, 2), '12' -> (12, None)."""
+    letters = "".join(c for c in ref if c.isalpha()).upper()
+    digits = "".join(c for c in ref if c.isdigit())
+    return (int(digits) if digits else None), (_column_number(letters) if letters else None)
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread_asyncio worksheet, supporting the calls the poller makes."""
+
+    def __init__(self, clock, rows, latency, title="Replay"):
+        self.clock = clock
+        self.rows = rows
+        self.latency = latency
+        self.title = title
+        self.calls = 0
+        # get_header_row and the window hints are keyed by URL, so every run gets a fresh one.
+        self.ws = type("ws", (), {"url": f"replay://{id(self)}"})()
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def _call(self):
+        self.calls += 1
+        self.clock.spend(self.latency)
+
+    async def row_values(self, row_number):
+        self._call()
+        return list(self.rows[row_number - 1]) if row_number <= len(self.rows) else []
+
+    async def batch_get(self, ranges, **kwargs):
+        self._call()
+        return [self._get_range(a1_range) for a1_range in ranges]
+
+    def _get_range(self, a1_range):
+        start, _, end = a1_range.partition(":")
+        start_row, start_col = _parse_a1(start)
+        end_row, end_col = _parse_a1(end) if end else (start_row, start_col)
+        first_row = start_row or 1
+        last_row = min(end_row or len(self.rows), len(self.rows))
+        values = []
+        for row in self.rows[first_row - 1:last_row]:
+            if start_col is None:
+                values.append(list(row))
+            else:
+                cells = list(row[start_col - 1:end_col])
+                while cells and cells[-1] == "":
+                    cells.pop()
+                values.append(cells)
+        # Like the Sheets API, trailing empty rows are left out.
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+
+class FakeChannel:
+    def __init__(self, channel_id, clock, latency):
+        self.id = channel_id
+        self.name = f"replay-{channel_id}"
+        self.clock = clock
+        self.latency = latency
+        self.sent = []
+
+    async def send(self, content, **kwargs):
+        self.clock.spend(self.latency)
+        self.sent.append((self.clock.now(), content))
+
+
+def synthetic_stream(sales, burst_size, mean_gap, seed):
+    """Bursts of `burst_size` rows appended at once, with exponentially distributed gaps between bursts."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 5, 9, 0, 0)
+    offset = 0.0
+    appends = []
+    while len(appends) < sales:
+        offset += rng.expovariate(1 / mean_gap)
+        for _ in range(min(burst_size, sales - len(appends))):
+            sale_time = start + timedelta(seconds=offset)
+            appends.append((offset, [
+                sale_time.strftime("%Y-%m-%d %H:%M:%S"), rng.choice(SYNTHETIC_NAMES), "Final Expense",
+                f"{rng.randint(300, 3000)}.00", "Carrier A", "Digital", "0-30", str(rng.randint(0, 6)),
+            ]))
+    return SYNTHETIC_HEADERS, appends
+
+
+def synthetic_history(rows, seed):
+    """Rows already on the sheet before the replay starts, dated in the weeks before it."""
+    rng = random.Random(seed + 1)
+    start = datetime(2025, 12, 1, 9, 0, 0)
+    history = []
+    for i in range(rows):
+        sale_time = start + timedelta(minutes=30 * i * 35 / max(rows, 1))
+        history.append([
+            sale_time.strftime("%Y-%m-%d %H:%M:%S"), rng.choice(SYNTHETIC_NAMES), "Final Expense",
+            f"{rng.randint(300, 3000)}.00", "Carrier A", "Digital", "0-30", str(rng.randint(0, 6)),
+        ])
+    return history
+
+
+def load_recorded_stream(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        appends = [(float(line[0]), line[1:]) for line in reader if line]
+    return header[1:], sorted(appends, key=lambda append: append[0])
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+async def run_scenario(headers, appends, history, poll_interval, sheets_latency, discord_latency):
+    """Replays one scenario against a fresh outbox in a temporary directory, removed afterwards."""
+    with tempfile.TemporaryDirectory(prefix="winbot_replay_") as state_dir:
+        outbox = NotificationOutbox(os.path.join(state_dir, "state.db"))
+        try:
+            return await _replay(outbox, headers, appends, history, poll_interval, sheets_latency, discord_latency)
+        finally:
+            outbox.close()
+
+
+async def _replay(outbox, headers, appends, history, poll_interval, sheets_latency, discord_latency):
+    clock = VirtualClock()
+    sheet = FakeWorksheet(clock, [list(headers)] + [list(row) for row in history], sheets_latency)
+    channels = {channel_id: FakeChannel(channel_id, clock, discord_latency) for channel_id in (NOTIFICATION_CHANNEL_ID, CHAT_CHANNEL_ID)}
+    source = SalesSource(name="Replay", worksheet_name=sheet.title,
+                         notification_channel_id=NOTIFICATION_CHANNEL_ID, chat_channel_id=CHAT_CHANNEL_ID)
+
+    main.notification_outbox_g = outbox
+    main.sheet_indexes_g.clear()
+    main.last_known_row_count_g.clear()
+    main.gsu.get_sheet = lambda source=None: _async_value(sheet)
+    main.bot.get_channel = channels.get
+
+    # Record when each row's notification reaches the notification channel.
+    posted_at = {}
+    claimed = {}
+    real_claim_due, real_mark_sent = outbox.claim_due, outbox.mark_sent
+
+    def claim_due(limit=10):
+        items = real_claim_due(limit)
+        claimed.update((item.id, item) for item in items)
+        return items
+
+    def mark_sent(item_id):
+        item = claimed.get(item_id)
+        if item is not None and item.channel_id == NOTIFICATION_CHANNEL_ID:
+            posted_at.setdefault(int(item.row_key.split(":")[0]), clock.now())
+        real_mark_sent(item_id)
+
+    outbox.claim_due, outbox.mark_sent = claim_due, mark_sent
+
+    clock.begin_step(0.0)
+    await main.initialize_row_count(source)
+    clock.end_step()
+    setup_calls = sheet.calls
+
+    appended_at = {}
+    next_append = 0
+    next_poll = poll_interval
+    next_drain = DRAIN_INTERVAL
+    deadline = (appends[-1][0] if appends else 0) + 10 * poll_interval + 60
+    polls = 0
+
+    while True:
+        # Appends due by the next poll or drain land on the sheet first.
+        next_step = min(next_poll, next_drain)
+        while next_append < len(appends) and appends[next_append][0] <= next_step:
+            sheet.rows.append(list(appends[next_append][1]))
+            appended_at[len(sheet.rows)] = appends[next_append][0]
+            next_append += 1
+        if next_step > deadline or (next_append == len(appends) and len(posted_at) >= len(appended_at)):
+            break
+
+        clock.begin_step(next_step)
+        if next_poll <= next_drain:
+            await main.poll_source_for_new_sales(source)
+            polls += 1
+            next_poll += poll_interval
+        else:
+            await main.drain_notification_outbox()
+            next_drain += DRAIN_INTERVAL
+        clock.end_step()
+        next_poll = max(next_poll, clock.base)
+        next_drain = max(next_drain, clock.base)
+
+    latencies = [posted_at[row] - appended_at[row] for row in appended_at if row in posted_at]
+    sales = len(appended_at)
+    discord_calls = sum(len(channel.sent) for channel in channels.values())
+    return {
+        "poll_interval": poll_interval,
+        "sales": sales,
+        "posted": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "polls": polls,
+        "sheets_calls_per_sale": (sheet.calls - setup_calls) / sales if sales else 0.0,
+        "discord_calls_per_sale": discord_calls / sales if sales else 0.0,
+    }
+
+
+async def _async_value(value):
+    return value
+
+
+def format_results(results):
+    lines = [f"{'scenario':<22}{'poll s':>8}{'sales':>7}{'posted':>8}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}"
+             f"{'polls':>7}{'sheets/sale':>13}{'discord/sale':>14}"]
+    for label, result in results:
+        def seconds(value):
+            return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+        lines.append(f"{label:<22}{result['poll_interval']:>8g}{result['sales']:>7}{result['posted']:>8}"
+                     f"{seconds(result['p50'])}{seconds(result['p95'])}{seconds(result['p99'])}"
+                     f"{result['polls']:>7}{result['sheets_calls_per_sale']:>13.2f}{result['discord_calls_per_sale']:>14.2f}")
+    return "\n".join(lines)
+
+
+def _number_list(value, cast):
+    return [cast(piece) for piece in value.split(",") if piece.strip()]
+
+
+async def run(args):
+    history = synthetic_history(args.history_rows, args.seed)
+    results = []
+    for poll_interval in _number_list(args.poll_intervals, float):
+        if args.replay:
+            headers, appends = load_recorded_stream(args.replay)
+            scenarios = [(os.path.basename(args.replay), headers, appends)]
+        else:
+            scenarios = []
+            for burst_size in _number_list(args.burst_sizes, int):
+                headers, appends = synthetic_stream(args.sales, burst_size, args.mean_gap * burst_size, args.seed)
+                scenarios.append((f"burst of {burst_size}", headers, appends))
+        for label, headers, appends in scenarios:
+            sheet_history = history if headers == SYNTHETIC_HEADERS else []
+            result = await run_scenario(headers, appends, sheet_history, poll_interval,
+                                        args.sheets_latency_ms / 1000, args.discord_latency_ms / 1000)
+            results.append((label, result))
+    return results
+
+
+def close_state():
+    """Closes the stores main opened at import time and removes their directory."""
+    _import_time_outbox.close()
+    main.live_leaderboard_store_g.close()
+    _state_dir.cleanup()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Replay sheet appends through the poller and report append-to-post latency.")
+    parser.add_argument("--replay", help="CSV of recorded appends (offset_seconds, then the sheet's columns)")
+    parser.add_argument("--poll-intervals", default="15,30,60", help="comma-separated poll intervals in seconds")
+    parser.add_argument("--burst-sizes", default="1,5,20", help="comma-separated numbers of rows appended at once (synthetic streams)")
+    parser.add_argument("--sales", type=int, default=100, help="sales per synthetic stream")
+    parser.add_argument("--mean-gap", type=float, default=90.0, help="mean seconds between single sales; bursts are spaced proportionally")
+    parser.add_argument("--history-rows", type=int, default=2000, help="rows already on the synthetic sheet")
+    parser.add_argument("--sheets-latency-ms", type=float, default=250.0, help="simulated latency of each Sheets call")
+    parser.add_argument("--discord-latency-ms", type=float, default=120.0, help="simulated latency of each Discord send")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        close_state()
+    print()
+    print(format_results(results))
+
+
+if __name__ == "__main__":
+    main_cli()
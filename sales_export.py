@@ -0,0 +1,215 @@
+import csv
+import os
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Optional
+
+import google_sheet_utils as gsu
+import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it exports are CSV only
+    pa = pq = None
+
+
+# Rows fetched per Sheets request. Only one chunk is held in memory at a time.
+EXPORT_CHUNK_ROWS = 2000
+# Aggregate periods and the label used in file names and messages.
+EXPORT_PERIODS = {"day": "daily", "week": "weekly", "month": "monthly"}
+
+
+@dataclass
+class ExportFilters:
+    """Optional filters; dates are inclusive and compared with the sale's Eastern wall-clock date."""
+    since: Optional[date] = None
+    until: Optional[date] = None
+    salesperson_ids: Optional[set] = None
+
+    @property
+    def active(self):
+        return self.since is not None or self.until is not None or self.salesperson_ids is not None
+
+
+@dataclass
+class ExportResult:
+    rows_path: str
+    aggregates_path: str
+    rows_written: int = 0
+    rows_scanned: int = 0
+    files: list = field(default_factory=list)
+
+
+def parquet_available():
+    return pq is not None
+
+
+def period_start(sale_date, period):
+    """The first day of the day/week/month 'sale_date' falls in."""
+    day = sale_date.date()
+    if period == "month":
+        return day.replace(day=1)
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+async def iter_sheet_chunks(sheet, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields the sheet's data rows (header excluded) in lists of at most chunk_rows, one batch_get per chunk."""
+    start = 2
+    while start <= sheet.row_count:
+        end = start + chunk_rows - 1
+        value_ranges = await sheet.batch_get([f"{start}:{end}"])
+        chunk = [list(row) for row in value_ranges[0]] if value_ranges else []
+        if chunk:
+            yield chunk
+        start = end + 1
+
+
+class PeriodAggregator:
+    """Running premium and app totals per (period start, salesperson id). Memory grows with periods x people, not rows."""
+
+    def __init__(self, period):
+        self.period = period
+        self.totals = {}
+
+    def add(self, person_id, sale_date, premium):
+        key = (period_start(sale_date, self.period), person_id)
+        totals = self.totals.get(key)
+        if totals is None:
+            self.totals[key] = [premium, 1]
+        else:
+            totals[0] += premium
+            totals[1] += 1
+
+    def rows(self):
+        """[period_start, salesperson, premium, apps] rows, by period and then premium, highest first."""
+        ordered = sorted(self.totals.items(), key=lambda item: (item[0][0], -item[1][0]))
+        return [[key[0].isoformat(), gsu.salespeople.name(key[1]), round(totals[0], 2), totals[1]] for key, totals in ordered]
+
+
+def _cell(row, col):
+    return row[col] if col is not None and col < len(row) else ""
+
+
+def process_chunk(chunk, columns, filters, aggregator):
+    """
+    Filters one chunk and adds its sales to the aggregator. Returns the rows to write.
+    'columns' holds the timestamp, name and premium column indexes (None if the sheet lacks one).
+    Safe to run in a worker thread; it only touches this export's aggregator.
+    """
+    ts_col, name_col, premium_col = columns
+    kept = []
+    for row in chunk:
+        parsed = gsu.parse_sale_row(_cell(row, ts_col), _cell(row, name_col), _cell(row, premium_col) or "0")
+        if parsed is None:
+            # Rows that can't be dated or attributed can't pass a filter, but are still part of a full export.
+            if not filters.active:
+                kept.append(row)
+            continue
+
+        person_id, sale_date, premium = parsed
+        if filters.since is not None and sale_date.date() < filters.since:
+            continue
+        if filters.until is not None and sale_date.date() > filters.until:
+            continue
+        if filters.salesperson_ids is not None and person_id not in filters.salesperson_ids:
+            continue
+        kept.append(row)
+        aggregator.add(person_id, sale_date, premium)
+    return kept
+
+
+def _unique_column_names(headers):
+    """Blank and repeated headers get made unique (Parquet needs distinct column names)."""
+    names, seen = [], set()
+    for i, header in enumerate(headers):
+        name = str(header).strip() or f"column_{i + 1}"
+        candidate, suffix = name, 2
+        while candidate in seen:
+            candidate, suffix = f"{name}_{suffix}", suffix + 1
+        seen.add(candidate)
+        names.append(candidate)
+    return names
+
+
+class _CsvWriter:
+    def __init__(self, path, columns):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+        self._width = len(columns)
+
+    def write_rows(self, rows):
+        self._writer.writerows(row + [""] * (self._width - len(row)) for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, columns, types=None):
+        self._columns = columns
+        self._schema = pa.schema([(name, (types or {}).get(name, pa.string())) for name in columns])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        arrays = [[row[i] if i < len(row) else None for row in rows] for i in range(len(self._columns))]
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=self._schema.field(i).type) for i, values in enumerate(arrays)], schema=self._schema
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+def _open_writer(fmt, path, columns, types=None):
+    if fmt == "parquet":
+        return _ParquetWriter(path, columns, types)
+    return _CsvWriter(path, columns)
+
+
+async def export_sales(sheet, out_dir, fmt="csv", filters=None, period="week", chunk_rows=EXPORT_CHUNK_ROWS, file_prefix="sales"):
+    """
+    Streams a sheet's sales history into out_dir as '<prefix>_rows.<fmt>' (the filtered rows, all columns)
+    and '<prefix>_<daily|weekly|monthly>_totals.<fmt>' (premium and apps per period and salesperson).
+    Reads and writes one chunk at a time, so memory stays flat however large the sheet is.
+    """
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export needs pyarrow, which isn't installed")
+    filters = filters or ExportFilters()
+
+    headers = await gsu.get_header_row(sheet, refresh=True)
+    columns = _unique_column_names(headers)
+    column_indexes = settings.get().columns.indexes(str(header) for header in headers)
+    tracked = [column_indexes["timestamp"], column_indexes["first_name"], column_indexes["premium"]]
+
+    result = ExportResult(
+        rows_path=os.path.join(out_dir, f"{file_prefix}_rows.{fmt}"),
+        aggregates_path=os.path.join(out_dir, f"{file_prefix}_{EXPORT_PERIODS[period]}_totals.{fmt}"),
+    )
+    aggregator = PeriodAggregator(period)
+    writer = _open_writer(fmt, result.rows_path, columns)
+    try:
+        async for chunk in iter_sheet_chunks(sheet, chunk_rows):
+            kept = await gsu.run_offloaded(process_chunk, chunk, tracked, filters, aggregator, rows=len(chunk))
+            writer.write_rows(kept)
+            result.rows_scanned += len(chunk)
+            result.rows_written += len(kept)
+    finally:
+        writer.close()
+
+    aggregate_columns = ["period_start", "salesperson", "premium", "apps"]
+    aggregate_types = {"premium": pa.float64(), "apps": pa.int64()} if fmt == "parquet" else None
+    aggregate_writer = _open_writer(fmt, result.aggregates_path, aggregate_columns, aggregate_types)
+    try:
+        aggregate_writer.write_rows(aggregator.rows())
+    finally:
+        aggregate_writer.close()
+
+    result.files = [result.rows_path, result.aggregates_path]
+    print(f"Exported {result.rows_written} of {result.rows_scanned} rows from '{sheet.title}' as {fmt}.")
+    return result
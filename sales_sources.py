@@ -0,0 +1,100 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class SalesSource:
+    """One team's sales worksheet and the Discord channels its notifications and leaderboards go to."""
+    name: str
+    worksheet_name: str
+    spreadsheet_id: Optional[str] = None
+    spreadsheet_name: Optional[str] = None
+    notification_channel_id: Optional[int] = None
+    chat_channel_id: Optional[int] = None
+    leaderboard_channel_id: Optional[int] = None
+
+
+def _parse_channel_id(value, setting_name):
+    """Returns the channel ID as an int, or None (with a printed error) if it is missing or invalid."""
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        print(f"Error: {setting_name} '{value}' is not a valid integer.")
+        return None
+
+
+def _default_source():
+    """The single source described by the original GOOGLE_* and *_CHANNEL_ID settings in .env."""
+    return SalesSource(
+        name=os.getenv("TEAM_NAME", "Team"),
+        worksheet_name=os.getenv("GOOGLE_SHEET_WORKSHEET_NAME"),
+        spreadsheet_id=os.getenv("GOOGLE_SPREADSHEET_ID"),
+        spreadsheet_name=os.getenv("GOOGLE_SHEET_NAME"),
+        notification_channel_id=_parse_channel_id(os.getenv("NOTIFICATION_CHANNEL_ID"), "NOTIFICATION_CHANNEL_ID"),
+        chat_channel_id=_parse_channel_id(os.getenv("CHAT_CHANNEL_ID"), "CHAT_CHANNEL_ID"),
+        leaderboard_channel_id=_parse_channel_id(os.getenv("AUTOMATED_LEADERBOARD_CHANNEL_ID"), "AUTOMATED_LEADERBOARD_CHANNEL_ID"),
+    )
+
+
+def load_sales_sources():
+    """
+    Loads the list of sales sources.
+    If SALES_SOURCES_FILE is set it must point to a JSON list of objects with a "name" and "worksheet",
+    plus optional "spreadsheet_id", "spreadsheet_name", "notification_channel_id", "chat_channel_id"
+    and "leaderboard_channel_id". Spreadsheet fields fall back to the values in .env.
+    Without the file, the bot runs a single source built from .env exactly as before.
+    """
+    sources_file = os.getenv("SALES_SOURCES_FILE")
+    if not sources_file:
+        return [_default_source()]
+
+    try:
+        with open(sources_file, encoding="utf-8") as f:
+            raw_sources = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: SALES_SOURCES_FILE '{sources_file}' not found. Falling back to the single source in .env.")
+        return [_default_source()]
+    except json.JSONDecodeError as e:
+        print(f"Error: SALES_SOURCES_FILE '{sources_file}' is not valid JSON: {e}. Falling back to the single source in .env.")
+        return [_default_source()]
+
+    if not isinstance(raw_sources, list):
+        print(f"Error: SALES_SOURCES_FILE '{sources_file}' must contain a JSON list. Falling back to the single source in .env.")
+        return [_default_source()]
+
+    sources = []
+    seen_names = set()
+    for i, raw in enumerate(raw_sources):
+        if not isinstance(raw, dict):
+            print(f"Error: Sales source #{i+1} in {sources_file} is not a JSON object. Skipping it.")
+            continue
+        name = str(raw.get("name") or "").strip()
+        worksheet_name = raw.get("worksheet")
+        if not name or not worksheet_name:
+            print(f"Error: Sales source #{i+1} in {sources_file} needs both a 'name' and a 'worksheet'. Skipping it.")
+            continue
+        if name in seen_names:
+            print(f"Error: Sales source name '{name}' is used more than once in {sources_file}. Skipping the duplicate.")
+            continue
+        seen_names.add(name)
+
+        sources.append(SalesSource(
+            name=name,
+            worksheet_name=worksheet_name,
+            spreadsheet_id=raw.get("spreadsheet_id", os.getenv("GOOGLE_SPREADSHEET_ID")),
+            spreadsheet_name=raw.get("spreadsheet_name", os.getenv("GOOGLE_SHEET_NAME")),
+            notification_channel_id=_parse_channel_id(raw.get("notification_channel_id"), f"{name} notification_channel_id"),
+            chat_channel_id=_parse_channel_id(raw.get("chat_channel_id"), f"{name} chat_channel_id"),
+            leaderboard_channel_id=_parse_channel_id(raw.get("leaderboard_channel_id"), f"{name} leaderboard_channel_id"),
+        ))
+
+    if not sources:
+        print(f"Error: No usable sales sources in {sources_file}. Falling back to the single source in .env.")
+        return [_default_source()]
+
+    print(f"Loaded {len(sources)} sales sources: {', '.join(source.name for source in sources)}")
+    return sources
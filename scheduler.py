@@ -0,0 +1,156 @@
+import asyncio
+import re
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Optional
+
+
+_DAY_NAMES = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+# Accepted spellings: the three-letter abbreviation or the full name.
+_DAY_LOOKUP = {**_DAY_NAMES, **{name: day for day, name in enumerate(
+    ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"))}}
+_CLOCK_RE = re.compile(r"(\d{1,2}):(\d{2})")
+
+# A run more than this late (e.g. the machine was asleep) is skipped instead of fired.
+MISFIRE_GRACE = timedelta(minutes=10)
+# The scheduler never sleeps longer than this, so clock changes are picked up quickly.
+MAX_SLEEP_SECONDS = 60
+
+
+def parse_schedule(spec: str):
+    """
+    Parses a schedule like "19:00", "daily 19:00", "tue 13:30", "tuesday 13:30" or "mon,wed,fri 09:15".
+    Returns (time, weekdays) where weekdays is a frozenset of 0-6 (Monday = 0) or None for every day.
+    Raises ValueError for anything else.
+    """
+    parts = spec.strip().lower().split()
+    if len(parts) == 1:
+        days_part, clock_part = "daily", parts[0]
+    elif len(parts) == 2:
+        days_part, clock_part = parts
+    else:
+        raise ValueError(f"expected '[days] HH:MM', got '{spec}'")
+
+    clock_match = _CLOCK_RE.fullmatch(clock_part)
+    if clock_match is None:
+        raise ValueError(f"expected '[days] HH:MM', got '{spec}'")
+    hour, minute = int(clock_match.group(1)), int(clock_match.group(2))
+    if hour > 23 or minute > 59:
+        raise ValueError(f"'{clock_part}' is not a valid time in '{spec}'")
+    run_at = time(hour, minute)
+
+    if days_part == "daily":
+        return run_at, None
+    try:
+        weekdays = frozenset(_DAY_LOOKUP[day.strip()] for day in days_part.split(","))
+    except KeyError as e:
+        raise ValueError(f"unknown day {e} in '{spec}'") from None
+    return run_at, weekdays
+
+
+@dataclass
+class ScheduledJob:
+    """A timed job. `prewarm` (if any) runs `prewarm_lead` before each run so the job itself starts with warm data."""
+    name: str
+    run_at: time
+    callback: Callable[[], Awaitable[None]]
+    weekdays: Optional[frozenset] = None
+    prewarm: Optional[Callable[[], Awaitable[None]]] = None
+    prewarm_lead: timedelta = timedelta(minutes=5)
+    last_run: Optional[datetime] = field(default=None, repr=False)
+    prewarmed_for: Optional[datetime] = field(default=None, repr=False)
+
+
+class JobScheduler:
+    """
+    Runs every timed job from one task. Each wake-up picks the earliest pending event across all
+    jobs (a pre-warm or a run), sleeps until then and starts it as its own task, so a slow job
+    never delays another.
+    """
+
+    def __init__(self, tz):
+        self.tz = tz
+        self.jobs = []
+        self._started_at = None
+        self._task = None
+        self._running = set()
+
+    def register(self, job: ScheduledJob):
+        """Adds a job. A job with the same name is replaced, keeping its run history so a run that already happened isn't repeated."""
+        previous = next((existing for existing in self.jobs if existing.name == job.name), None)
+        if previous is not None:
+            job.last_run, job.prewarmed_for = previous.last_run, previous.prewarmed_for
+            self.jobs.remove(previous)
+        self.jobs.append(job)
+        days = "daily" if job.weekdays is None else ",".join(name for name, day in _DAY_NAMES.items() if day in job.weekdays)
+        print(f"Scheduled job '{job.name}': {days} at {job.run_at.strftime('%H:%M')} {self.tz.key}"
+              + (f", pre-warmed {job.prewarm_lead} ahead" if job.prewarm else ""))
+
+    def unregister(self, name: str):
+        self.jobs = [job for job in self.jobs if job.name != name]
+
+    def start(self):
+        """Starts the scheduler task. Safe to call more than once (e.g. from on_ready after a reconnect)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._started_at = datetime.now(self.tz)
+        self._task = asyncio.create_task(self._run())
+
+    def next_run_time(self, job: ScheduledJob, after: datetime) -> datetime:
+        """The first scheduled run strictly after `after`."""
+        day = after.date()
+        for _ in range(8):
+            candidate = datetime.combine(day, job.run_at, tzinfo=self.tz)
+            if candidate > after and (job.weekdays is None or candidate.weekday() in job.weekdays):
+                return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"job '{job.name}' has no run days")
+
+    def _next_event(self, now):
+        """Returns (when, kind, job, run_time) for the earliest pending pre-warm or run."""
+        best = None
+        for job in self.jobs:
+            run_time = self.next_run_time(job, job.last_run or self._started_at)
+            if job.prewarm and job.prewarmed_for != run_time and now < run_time:
+                event = (max(run_time - job.prewarm_lead, now), "prewarm", job, run_time)
+            else:
+                event = (run_time, "run", job, run_time)
+            if best is None or event[0] < best[0]:
+                best = event
+        return best
+
+    async def _run(self):
+        while True:
+            now = datetime.now(self.tz)
+            event = self._next_event(now)
+            if event is None:
+                return
+            when, kind, job, run_time = event
+
+            delay = (when - now).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, MAX_SLEEP_SECONDS))
+                continue
+
+            if kind == "prewarm":
+                job.prewarmed_for = run_time
+                self._spawn(f"{job.name} pre-warm", job.prewarm)
+            else:
+                job.last_run = run_time
+                if now - run_time > MISFIRE_GRACE:
+                    print(f"Skipping job '{job.name}' scheduled for {run_time.strftime('%Y-%m-%d %H:%M')}: it is {now - run_time} late.")
+                    continue
+                self._spawn(job.name, job.callback)
+
+    def _spawn(self, label, func):
+        async def runner():
+            try:
+                await func()
+            except Exception as e:
+                print(f"Error in scheduled job '{label}': {e}")
+                traceback.print_exc()
+
+        task = asyncio.create_task(runner())
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
@@ -0,0 +1,238 @@
+import json
+import os
+from dataclasses import dataclass, field, replace
+from datetime import timedelta
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from sales_sources import load_sales_sources
+from scheduler import parse_schedule
+
+
+@dataclass(frozen=True)
+class SaleColumns:
+    """Sheet column names the bot reads, from the *_COLUMN settings."""
+    timestamp: str = "Date"
+    first_name: str = "Name"
+    premium: str = "Premium"
+    sale_type: str = "Sale Type"
+    appointments_left: str = "Appointments Left"
+    carrier: str = "Carrier"
+    lead_age: str = "Lead Age"
+    lead_type: str = "Lead Type"
+    field_or_telesale: str = "Field or Telesale"
+    draft_date: str = "Draft Date"
+    face_value: str = "Face Value"
+
+    @property
+    def tracked(self):
+        """The columns the poller and leaderboards download: timestamp, name and premium."""
+        return [self.timestamp, self.first_name, self.premium]
+
+    def indexes(self, headers):
+        """{field name: 0-based column index, or None if the header row lacks it}. Cached per header row."""
+        return _column_indexes(self, tuple(headers))
+
+
+@lru_cache(maxsize=32)
+def _column_indexes(columns, headers):
+    positions = {}
+    for i, header in enumerate(headers):
+        positions.setdefault(header, i)
+    return {name: positions.get(getattr(columns, name)) for name in columns.__dataclass_fields__}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Every setting the bot reads, parsed and validated once. See README.md for what each one does."""
+    discord_bot_token: Optional[str]
+    google_service_account_file: Optional[str]
+    gemini_api_key: Optional[str]
+    onboarding_webhook_url: Optional[str]
+    columns: SaleColumns
+    sales_sources: tuple
+    org_leaderboard_channel_id: Optional[int]
+    alarm_emoji: str
+    gsd_emoji: str
+    tuesday_gif_url: Optional[str]
+    state_db_path: str
+    leaderboard_engine: str
+    leaderboard_read_mode: str
+    leaderboard_fresh_seconds: float
+    offload_min_rows: int
+    process_pool_min_rows: int
+    salesperson_aliases_file: Optional[str]
+    salesperson_aliases: tuple
+    live_leaderboards: Optional[str]
+    live_leaderboard_min_interval: float
+    schedule_leaderboard_post: str
+    schedule_tuesday_gif: str
+    schedule_prewarm_lead: timedelta
+    health_port: Optional[int]
+    health_host: str
+    health_max_poll_age: float
+    memory_report_interval_minutes: float
+    low_memory_mode: bool
+    low_memory_max_messages: int
+    loop_watchdog_enabled: bool
+    loop_lag_threshold_ms: float
+    loop_watchdog_export_file: Optional[str]
+    problems: tuple = field(default=(), compare=False)
+
+
+# Settings the running bot can't pick up: they shape the client, the state file, the servers it started,
+# or (for the tracked columns) the per-sheet indexes. A reload keeps their current values until a restart.
+RESTART_REQUIRED = (
+    "discord_bot_token", "google_service_account_file", "sales_sources", "state_db_path",
+    # Salesperson ids are interned for the life of the process, so aliases can't be remapped under them.
+    "salesperson_aliases_file", "salesperson_aliases",
+    "low_memory_mode", "low_memory_max_messages", "health_port", "health_host",
+    "loop_watchdog_enabled", "loop_lag_threshold_ms", "loop_watchdog_export_file",
+)
+RESTART_REQUIRED_COLUMNS = ("timestamp", "first_name", "premium")
+
+
+class _EnvReader:
+    """Reads .env values, converting them and collecting problems (the default is used instead) rather than raising."""
+
+    def __init__(self):
+        self.problems = []
+
+    def str(self, name, default=None):
+        value = os.getenv(name)
+        return value.strip() if value and value.strip() else default
+
+    def number(self, name, default, cast=float, minimum=None):
+        value = os.getenv(name)
+        if value is None or not value.strip():
+            return default
+        fallback = f"Using {default}." if default is not None else "Ignoring it."
+        try:
+            number = cast(value)
+        except ValueError:
+            self.problems.append(f"{name} '{value}' is not a valid {'integer' if cast is int else 'number'}. {fallback}")
+            return default
+        if minimum is not None and number < minimum:
+            self.problems.append(f"{name} {number} is below {minimum}. {fallback}")
+            return default
+        return number
+
+    def flag(self, name, default):
+        value = os.getenv(name)
+        if value is None or not value.strip():
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def choice(self, name, default, choices):
+        value = (os.getenv(name) or default).strip().lower()
+        if value not in choices:
+            self.problems.append(f"{name} '{value}' must be one of {', '.join(choices)}. Using '{default}'.")
+            return default
+        return value
+
+    def schedule(self, name, default):
+        value = self.str(name, default)
+        if value.lower() == "off":
+            return "off"
+        try:
+            parse_schedule(value)
+        except ValueError as e:
+            self.problems.append(f"{name} '{value}' is not a valid schedule ({e}). Using '{default}'.")
+            return default
+        return value
+
+
+def _load_salesperson_aliases(path, problems):
+    """(alias, canonical name) pairs from the SALESPERSON_ALIASES_FILE JSON object."""
+    if not path:
+        return ()
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw_aliases = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        problems.append(f"Couldn't load SALESPERSON_ALIASES_FILE '{path}': {e}. Ignoring it.")
+        return ()
+    if not isinstance(raw_aliases, dict):
+        problems.append(f"SALESPERSON_ALIASES_FILE '{path}' must contain a JSON object. Ignoring it.")
+        return ()
+    return tuple((str(alias), str(canonical)) for alias, canonical in raw_aliases.items())
+
+
+def load_settings():
+    """Builds Settings from the environment. Problems are collected in settings.problems."""
+    env = _EnvReader()
+    columns = SaleColumns(**{
+        name: env.str(f"{name.upper()}_COLUMN", default.default)
+        for name, default in SaleColumns.__dataclass_fields__.items()
+    })
+
+    # Bad team channel IDs are reported by load_sales_sources.
+
+    settings = Settings(
+        discord_bot_token=env.str("DISCORD_BOT_TOKEN"),
+        google_service_account_file=env.str("GOOGLE_SERVICE_ACCOUNT_FILE"),
+        gemini_api_key=env.str("GEMINI_API_KEY"),
+        onboarding_webhook_url=env.str("ONBOARDING_WEBHOOK_URL"),
+        columns=columns,
+        sales_sources=tuple(load_sales_sources()),
+        org_leaderboard_channel_id=env.number("AUTOMATED_LEADERBOARD_CHANNEL_ID", None, int),
+        alarm_emoji=env.str("ALARM_EMOJI_TAG", "<a:AlarmreminderUrgence:1370133606856392816>"),
+        gsd_emoji=env.str("GSD_EMOJI_TAG", "<:GSD:1369689499592036364>"),
+        tuesday_gif_url=env.str("TUESDAY_NOON_GIF_URL"),
+        state_db_path=env.str("STATE_DB_PATH", "winbot_state.db"),
+        leaderboard_engine=env.choice("LEADERBOARD_ENGINE", "auto", ("auto", "python", "numpy")),
+        leaderboard_read_mode=env.choice("LEADERBOARD_READ_MODE", "windowed", ("windowed", "full")),
+        leaderboard_fresh_seconds=env.number("LEADERBOARD_FRESH_SECONDS", 60.0, minimum=0),
+        offload_min_rows=env.number("OFFLOAD_MIN_ROWS", 2000, int, minimum=0),
+        process_pool_min_rows=env.number("PROCESS_POOL_MIN_ROWS", 0, int, minimum=0),
+        salesperson_aliases_file=env.str("SALESPERSON_ALIASES_FILE"),
+        salesperson_aliases=_load_salesperson_aliases(env.str("SALESPERSON_ALIASES_FILE"), env.problems),
+        live_leaderboards=env.str("LIVE_LEADERBOARDS"),
+        live_leaderboard_min_interval=env.number("LIVE_LEADERBOARD_MIN_INTERVAL", 60.0, minimum=0),
+        schedule_leaderboard_post=env.schedule("SCHEDULE_LEADERBOARD_POST", "daily 19:00"),
+        schedule_tuesday_gif=env.schedule("SCHEDULE_TUESDAY_GIF", "tue 13:30"),
+        schedule_prewarm_lead=timedelta(minutes=env.number("SCHEDULE_PREWARM_LEAD_MINUTES", 5.0, minimum=0)),
+        health_port=env.number("HEALTH_PORT", None, int, minimum=1),
+        health_host=env.str("HEALTH_HOST", "127.0.0.1"),
+        health_max_poll_age=env.number("HEALTH_MAX_POLL_AGE", 300.0, minimum=0),
+        memory_report_interval_minutes=env.number("MEMORY_REPORT_INTERVAL_MINUTES", 60.0, minimum=0),
+        low_memory_mode=env.flag("LOW_MEMORY_MODE", False),
+        low_memory_max_messages=env.number("LOW_MEMORY_MAX_MESSAGES", 100, int),
+        loop_watchdog_enabled=env.flag("LOOP_WATCHDOG_ENABLED", True),
+        loop_lag_threshold_ms=env.number("LOOP_LAG_THRESHOLD_MS", 500.0, minimum=1),
+        loop_watchdog_export_file=env.str("LOOP_WATCHDOG_EXPORT_FILE"),
+        problems=tuple(env.problems),
+    )
+    for problem in settings.problems:
+        print(f"Error: {problem}")
+    return settings
+
+
+_current = None
+
+
+def get():
+    """The current settings, loaded from .env on first use."""
+    global _current
+    if _current is None:
+        load_dotenv()
+        _current = load_settings()
+    return _current
+
+
+def reload():
+    """
+    Re-reads .env (overriding values loaded before) and swaps in the new settings. Settings in RESTART_REQUIRED
+    keep their current values. Returns (old, new, names of the changed settings that wait for a restart).
+    """
+    global _current
+    old = get()
+    load_dotenv(override=True)
+    loaded = load_settings()
+    kept = {name: getattr(old, name) for name in RESTART_REQUIRED if getattr(loaded, name) != getattr(old, name)}
+    kept_columns = {name: getattr(old.columns, name) for name in RESTART_REQUIRED_COLUMNS
+                    if getattr(loaded.columns, name) != getattr(old.columns, name)}
+    _current = replace(loaded, columns=replace(loaded.columns, **kept_columns), **kept)
+    return old, _current, list(kept) + [f"columns.{name}" for name in kept_columns]
@@ -0,0 +1,258 @@
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+import google_sheet_utils as gsu
+
+
+# Size of one row's fingerprint in SalesSheetIndex.fingerprints.
+ROW_HASH_BYTES = 8
+
+
+def hash_row(row_values):
+    """
+    Fingerprint of a row's cells. It is the same in every run, so the index's hashes can be saved
+    and diffed against the sheet after a restart (see SalesSheetIndex.resume).
+    """
+    return hashlib.blake2b("\x1f".join(map(str, row_values)).encode("utf-8"), digest_size=ROW_HASH_BYTES).digest()
+
+
+@dataclass
+class RowDiff:
+    """
+    What changed between two snapshots of a sheet. Indices are positions in get_all_values()
+    (0 is the header row): new-snapshot indices for appended/inserted rows, old-snapshot indices
+    for removed rows and (old, new) pairs for edited rows.
+    """
+    appended: list = field(default_factory=list)
+    inserted: list = field(default_factory=list)
+    edited: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    first_sales: set = field(default_factory=set)
+    headers_changed: bool = False
+
+    @property
+    def new_rows(self):
+        """Rows that are new sales, in sheet order."""
+        return sorted(self.inserted + self.appended)
+
+    @property
+    def has_changes(self):
+        return bool(self.appended or self.inserted or self.edited or self.removed or self.headers_changed)
+
+    def summary(self):
+        return (f"{len(self.appended)} appended, {len(self.inserted)} inserted, "
+                f"{len(self.edited)} edited, {len(self.removed)} removed")
+
+
+def diff_hashes(old_hashes, new_hashes):
+    """
+    Aligns two lists of row hashes and returns a RowDiff with 1-based data indices.
+    The common prefix and suffix are stripped first, so the expensive alignment only runs over
+    the region that actually changed; a plain append never reaches SequenceMatcher at all.
+    """
+    diff = RowDiff()
+    old_len, new_len = len(old_hashes), len(new_hashes)
+
+    if new_hashes[:old_len] == old_hashes:
+        diff.appended = list(range(old_len + 1, new_len + 1))
+        return diff
+
+    prefix = 0
+    limit = min(old_len, new_len)
+    while prefix < limit and old_hashes[prefix] == new_hashes[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while (suffix < old_len - prefix and suffix < new_len - prefix
+           and old_hashes[old_len - 1 - suffix] == new_hashes[new_len - 1 - suffix]):
+        suffix += 1
+
+    old_middle = old_hashes[prefix:old_len - suffix]
+    new_middle = new_hashes[prefix:new_len - suffix]
+    matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old_start, new_start = prefix + i1 + 1, prefix + j1 + 1
+        if tag == 'equal':
+            continue
+        if tag == 'replace':
+            paired = min(i2 - i1, j2 - j1)
+            diff.edited.extend((old_start + k, new_start + k) for k in range(paired))
+            diff.removed.extend(range(old_start + paired, old_start + (i2 - i1)))
+            added = range(new_start + paired, new_start + (j2 - j1))
+        elif tag == 'delete':
+            diff.removed.extend(range(old_start, old_start + (i2 - i1)))
+            continue
+        else:
+            added = range(new_start, new_start + (j2 - j1))
+        # Rows after the last surviving old row are appends; anything before it was inserted mid-sheet.
+        for index in added:
+            if suffix == 0 and prefix + i2 == old_len:
+                diff.appended.append(index)
+            else:
+                diff.inserted.append(index)
+
+    return diff
+
+
+class SalesSheetIndex:
+    """
+    Per-sheet cache of row hashes, parsed sale rows and per-salesperson row counts (keyed by gsu.salespeople ids).
+    Each update diffs a fresh snapshot against the cache and only re-parses and re-counts the
+    rows that were appended, inserted, edited or removed, so edits and deletions are picked up
+    without recomputing everything, and leaderboards can be built without another fetch.
+    """
+
+    def __init__(self, timestamp_column, first_name_column, premium_column):
+        self.timestamp_column = timestamp_column
+        self.first_name_column = first_name_column
+        self.premium_column = premium_column
+        self.headers = None
+        self.row_count = 0
+        self._hashes = []
+        self._parsed = []
+        self._person_ids = []
+        self.person_counts = Counter()
+
+    @property
+    def fingerprints(self):
+        """Every data row's hash packed into one bytes value, for saving with the row cursor."""
+        return b"".join(self._hashes)
+
+    @property
+    def parsed_rows(self):
+        """Parsed (salesperson id, sale_date, premium) tuples for every data row, None for rows the leaderboard skips."""
+        return self._parsed
+
+    def snapshot(self):
+        """The cache's current state, for restore(). Cheap: update() replaces the row lists rather than changing them."""
+        return self.headers, self.row_count, self._hashes, self._parsed, self._person_ids, Counter(self.person_counts)
+
+    def restore(self, state):
+        """Puts back a snapshot(), undoing the updates since, so their changes are reported again by the next update."""
+        self.headers, self.row_count, self._hashes, self._parsed, self._person_ids, person_counts = state
+        self.person_counts = Counter(person_counts)
+
+    def _column_index(self, headers, column):
+        try:
+            return headers.index(column)
+        except ValueError:
+            return None
+
+    def _parse(self, row_values, columns):
+        values = [row_values[c] if c is not None and c < len(row_values) else None for c in columns]
+        person_id = gsu.salespeople.resolve(values[1]) if values[1] else None
+        parsed = gsu.parse_sale_row(values[0], values[1], values[2] if values[2] is not None else "0")
+        return parsed, person_id
+
+    def resume(self, all_values, fingerprints):
+        """
+        Builds the cache as it was when 'fingerprints' was saved, taking parsed rows from the current rows
+        that still match a saved one. The next update() then reports every change made since, wherever in
+        the sheet it happened, so rows added, removed or moved while the bot was down are told apart.
+        """
+        headers = all_values[0] if all_values else []
+        rows = all_values[1:]
+        saved_hashes = [fingerprints[i:i + ROW_HASH_BYTES] for i in range(0, len(fingerprints), ROW_HASH_BYTES)]
+        columns = [self._column_index(headers, c) for c in (self.timestamp_column, self.first_name_column, self.premium_column)]
+
+        diff = diff_hashes(saved_hashes, [hash_row(row) for row in rows])
+        changed_new = set(diff.appended) | set(diff.inserted) | {new for _, new in diff.edited}
+        removed_old = set(diff.removed) | {old for old, _ in diff.edited}
+        kept_old = [i for i in range(1, len(saved_hashes) + 1) if i not in removed_old]
+        kept_new = [i for i in range(1, len(rows) + 1) if i not in changed_new]
+        # Saved rows that are gone from the sheet can't be parsed; they only matter as removals now.
+        parsed = [None] * len(saved_hashes)
+        person_ids = [None] * len(saved_hashes)
+        for old_index, new_index in zip(kept_old, kept_new):
+            parsed[old_index - 1], person_ids[old_index - 1] = self._parse(rows[new_index - 1], columns)
+
+        self.headers = headers
+        self.row_count = len(saved_hashes) + 1
+        self._hashes = saved_hashes
+        self._parsed = parsed
+        self._person_ids = person_ids
+        self.person_counts = Counter(person_id for person_id in person_ids if person_id is not None)
+
+    def update(self, all_values):
+        """
+        Diffs a get_all_values() snapshot against the cache, applies the changes and returns the RowDiff.
+        The first update only builds the cache and reports no changes.
+        """
+        headers = all_values[0] if all_values else []
+        rows = all_values[1:]
+        new_hashes = [hash_row(row) for row in rows]
+        columns = [self._column_index(headers, c) for c in (self.timestamp_column, self.first_name_column, self.premium_column)]
+
+        if self.headers is None or headers != self.headers:
+            first_load = self.headers is None
+            previous_count = self.row_count
+            self._rebuild(headers, rows, new_hashes, columns)
+            self.row_count = len(all_values)
+            if first_load:
+                return RowDiff()
+            # Columns may have moved, so hashes can't be lined up; fall back to treating extra rows as appends.
+            diff = RowDiff(headers_changed=True, appended=list(range(max(previous_count, 1), len(all_values))))
+            self._mark_first_sales(diff, recount=True)
+            return diff
+
+        diff = diff_hashes(self._hashes, new_hashes)
+        if not diff.has_changes:
+            return diff
+
+        # Drop the contributions of old rows that were removed or replaced by an edit.
+        for old_index in diff.removed + [old for old, _ in diff.edited]:
+            person_id = self._person_ids[old_index - 1]
+            if person_id is not None:
+                self.person_counts[person_id] -= 1
+                if self.person_counts[person_id] <= 0:
+                    del self.person_counts[person_id]
+
+        # Carry over unchanged rows by position, then fill in the changed rows from the new snapshot.
+        changed_new = set(diff.appended) | set(diff.inserted) | {new for _, new in diff.edited}
+        removed_old = set(diff.removed) | {old for old, _ in diff.edited}
+        kept_old = [i for i in range(1, len(self._hashes) + 1) if i not in removed_old]
+        kept_new = [i for i in range(1, len(new_hashes) + 1) if i not in changed_new]
+        parsed = [None] * len(rows)
+        person_ids = [None] * len(rows)
+        for old_index, new_index in zip(kept_old, kept_new):
+            parsed[new_index - 1] = self._parsed[old_index - 1]
+            person_ids[new_index - 1] = self._person_ids[old_index - 1]
+        for new_index in changed_new:
+            parsed[new_index - 1], person_ids[new_index - 1] = self._parse(rows[new_index - 1], columns)
+
+        self._hashes = new_hashes
+        self._parsed = parsed
+        self._person_ids = person_ids
+        self.row_count = len(all_values)
+
+        for _, new_index in diff.edited:
+            person_id = person_ids[new_index - 1]
+            if person_id is not None:
+                self.person_counts[person_id] += 1
+        self._mark_first_sales(diff)
+        return diff
+
+    def _mark_first_sales(self, diff, recount=False):
+        """Counts the new rows' salespeople in sheet order, flagging each row whose salesperson hasn't been seen before."""
+        new_rows = diff.new_rows
+        if recount:
+            new_set = set(new_rows)
+            self.person_counts = Counter(person_id for i, person_id in enumerate(self._person_ids, start=1)
+                                       if person_id is not None and i not in new_set)
+        for new_index in new_rows:
+            person_id = self._person_ids[new_index - 1]
+            if person_id is None:
+                continue
+            if self.person_counts[person_id] == 0:
+                diff.first_sales.add(new_index)
+            self.person_counts[person_id] += 1
+
+    def _rebuild(self, headers, rows, hashes, columns):
+        self.headers = headers
+        self._hashes = hashes
+        parsed_and_ids = [self._parse(row, columns) for row in rows]
+        self._parsed = [parsed for parsed, _ in parsed_and_ids]
+        self._person_ids = [person_id for _, person_id in parsed_and_ids]
+        self.person_counts = Counter(person_id for person_id in self._person_ids if person_id is not None)